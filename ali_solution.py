@@ -21,8 +21,179 @@
 # 8) Once all pucks have been worked on & return to their original location, the program is successfully complete.
 
 
+import array
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import itertools
 import math
-import random
+
+import numpy as np
+
+import assignment
+import nearest_lookup
+from board_layout import DEFAULT_LAYOUT
+from events import ConsoleSink, NullSink
+from instrumentation import Instrumentation
+
+# maps occupied flags (0 or 1 bytes) to binary digits, for building the occupancy bitmap from a bytearray
+_OCCUPANCY_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+# ways PuckLibrary.assign_all can assign pucks to parking spots
+ASSIGNMENT_MODES = ("greedy", "total", "bottleneck")
+
+# upper bound on the number of puck/spot distances held in memory at once by PuckLibrary.assign_all
+_DISTANCE_BLOCK_SIZE = 1 << 22
+
+# largest coordinate magnitude check_coordinate accepts: squared distances between two such points stay at or below
+# 2^53, so the float64 distance computations (see _nearest_spots) are exact and pick the truly closest spot
+_COORDINATE_LIMIT = 1 << 25
+
+
+def _head_mask(spot_count, occupied_count):
+    """Return the occupancy bitmap of a path of spot_count spots whose last occupied_count spots are occupied."""
+    return (1 << spot_count) - (1 << (spot_count - occupied_count))
+
+
+def _set_bits(bitmap):
+    """Generate the positions of the set bits of an integer bitmap, lowest first."""
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+
+def _nearest_spots(puck_x, puck_y, spot_x, spot_y, occupied):
+    """
+    This function returns the position of the nearest unoccupied parking spot of every puck, ignoring the other
+    pucks, computed with NumPy in row blocks of the puck x spot distance matrix. Squared distances are computed in
+    float64, which cannot wrap around like int64 does for far-apart coordinates (they are exact while they stay below
+    2^53, so ties are still broken by path order on any realistic board).
+    """
+    puck_x, puck_y = np.asarray(puck_x, dtype=np.float64), np.asarray(puck_y, dtype=np.float64)
+    spot_x, spot_y = np.asarray(spot_x, dtype=np.float64), np.asarray(spot_y, dtype=np.float64)
+    unavailable = np.inf
+    nearest = np.empty(len(puck_x), dtype=np.intp)
+    block = max(1, _DISTANCE_BLOCK_SIZE // len(spot_x))
+    for start in range(0, len(puck_x), block):
+        stop = start + block
+        distances = (np.subtract.outer(puck_x[start:stop], spot_x) ** 2 +
+                     np.subtract.outer(puck_y[start:stop], spot_y) ** 2)
+        distances[:, occupied] = unavailable
+        nearest[start:stop] = distances.argmin(axis=1)
+
+    return nearest
+
+
+def _greedy_assignment(puck_x, puck_y, spot_x, spot_y, occupied, nearest=None):
+    """
+    This function returns the parking spot position the greedy assignment gives each puck (see
+    PuckLibrary.assign_all) and the number of conflicts it had to resolve, without moving anything. nearest can be
+    given when the pucks' nearest spots were already computed (see PuckLibrary.assign_batch); a nearest spot that
+    turns out to be occupied is then resolved as a conflict.
+    """
+    occupied = occupied.copy()
+    puck_x, puck_y = np.asarray(puck_x, dtype=np.float64), np.asarray(puck_y, dtype=np.float64)
+    spot_x, spot_y = np.asarray(spot_x, dtype=np.float64), np.asarray(spot_y, dtype=np.float64)
+
+    # nearest free spot of every puck, ignoring the other pucks in this batch
+    if nearest is None:
+        nearest = _nearest_spots(puck_x, puck_y, spot_x, spot_y, occupied)
+    else:
+        nearest = nearest.copy()
+
+    # resolve conflicts greedily in puck order (float64 squared distances, as in _nearest_spots)
+    unavailable = np.inf
+    conflicts = 0
+    for idx, spot_idx in enumerate(nearest.tolist()):
+        if occupied[spot_idx]:
+            conflicts += 1
+            distances = (spot_x - puck_x[idx]) ** 2 + (spot_y - puck_y[idx]) ** 2
+            distances[occupied] = unavailable
+            spot_idx = nearest[idx] = distances.argmin()
+
+        occupied[spot_idx] = True
+
+    return nearest, conflicts
+
+
+def _whole_coordinate(value):
+    """Return a coordinate as a whole number of millimetres (the stores hold int64), rounding non-integer values."""
+    try:
+        return int(round(value))
+    except (TypeError, ValueError):
+        raise TypeError("Coordinates must be numbers, got {!r}".format(value)) from None
+
+
+def check_coordinate(value):
+    """
+    This function returns a coordinate as the whole number the stores hold (see _whole_coordinate), for validating
+    coordinates that come from outside the program. Raises TypeError if it is not a number and OverflowError if it
+    is beyond +/- 2^25 mm, where nearest-spot distances would no longer be exact.
+    """
+    coordinate = _whole_coordinate(value)
+    if not -_COORDINATE_LIMIT <= coordinate <= _COORDINATE_LIMIT:
+        raise OverflowError("Coordinate {!r} is out of range (+/- {}).".format(value, _COORDINATE_LIMIT))
+
+    return coordinate
+
+
+class PuckStore:
+    """
+    This class stores the data of many pucks in contiguous typed arrays (struct-of-arrays): one int64 array per
+    coordinate and one byte per work_complete flag, about 17 bytes per puck. Puck objects are lightweight views into a
+    store, and bulk operations can read and write the arrays directly.
+
+    x_coordinates - array<int64>
+    y_coordinates - array<int64>
+    work_complete - bytearray
+    """
+
+    __slots__ = ("x_coordinates", "y_coordinates", "work_complete")
+
+    def __init__(self):
+        self.x_coordinates = array.array("q")
+        self.y_coordinates = array.array("q")
+        self.work_complete = bytearray()
+
+    def __len__(self):
+        return len(self.work_complete)
+
+    def append(self, x_coordinate=0, y_coordinate=0):
+        """Add a puck to the store and return its index."""
+        self.x_coordinates.append(x_coordinate)
+        self.y_coordinates.append(y_coordinate)
+        self.work_complete.append(0)
+        return len(self.work_complete) - 1
+
+
+class SpotStore:
+    """
+    This class stores the data of many parking spots in contiguous typed arrays (struct-of-arrays): one int64 array
+    per coordinate and one byte per occupied flag. ParkingSpot objects are lightweight views into a store.
+
+    x_coordinates - array<int64>
+    y_coordinates - array<int64>
+    occupied - bytearray
+    """
+
+    __slots__ = ("x_coordinates", "y_coordinates", "occupied")
+
+    def __init__(self):
+        self.x_coordinates = array.array("q")
+        self.y_coordinates = array.array("q")
+        self.occupied = bytearray()
+
+    def __len__(self):
+        return len(self.occupied)
+
+    def append(self, x_coordinate, y_coordinate):
+        """Add a parking spot to the store and return its index."""
+        self.x_coordinates.append(x_coordinate)
+        self.y_coordinates.append(y_coordinate)
+        self.occupied.append(0)
+        return len(self.occupied) - 1
 
 
 class Puck:
@@ -31,37 +202,72 @@ class Puck:
     y-coordinate, and work_complete status flag for any instance of the object. Each data attribute has getter and
     setter methods to retrieve it from external to the class.
 
+    The data itself lives in a PuckStore; a Puck is a view of one index of that store. A Puck created on its own gets
+    a store of its own. Two Pucks viewing the same index of the same store are equal. Coordinates are stored as whole
+    millimetres: non-integer values are rounded to the nearest one.
+
     x_coordinate - int
     y_coordinate - int
     work_complete - boolean
     """
 
-    def __init__(self):
-        self.x_coordinate = 0
-        self.y_coordinate = 0
-        self.work_complete = False
+    __slots__ = ("store", "index")
+
+    def __init__(self, store=None):
+        if store is None:
+            store = PuckStore()
+
+        self.store = store
+        self.index = store.append()
+
+    @classmethod
+    def view(cls, store, index):
+        """Return a Puck viewing an existing entry of a PuckStore."""
+        puck = cls.__new__(cls)
+        puck.store = store
+        puck.index = index
+        return puck
+
+    def __eq__(self, other):
+        if not isinstance(other, Puck):
+            return NotImplemented
+
+        return self.store is other.store and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
 
     def get_x_coordinate(self):
-        return self.x_coordinate
+        return self.store.x_coordinates[self.index]
 
     def set_x_coordinate(self, x_coordinate):
-        self.x_coordinate = x_coordinate
+        try:
+            self.store.x_coordinates[self.index] = x_coordinate
+        except TypeError:
+            self.store.x_coordinates[self.index] = _whole_coordinate(x_coordinate)
 
     def get_y_coordinate(self):
-        return self.y_coordinate
+        return self.store.y_coordinates[self.index]
 
     def set_y_coordinate(self, y_coordinate):
-        self.y_coordinate = y_coordinate
+        try:
+            self.store.y_coordinates[self.index] = y_coordinate
+        except TypeError:
+            self.store.y_coordinates[self.index] = _whole_coordinate(y_coordinate)
 
     def get_work_complete_status(self):
-        return self.work_complete
+        return self.store.work_complete[self.index] == 1
 
     def set_work_complete_status(self):
-        if not self.work_complete:
-            self.work_complete = True
+        if not self.store.work_complete[self.index]:
+            self.store.work_complete[self.index] = 1
 
         return
 
+    x_coordinate = property(get_x_coordinate, set_x_coordinate)
+    y_coordinate = property(get_y_coordinate, set_y_coordinate)
+    work_complete = property(get_work_complete_status)
+
 
 class ParkingSpot:
     """
@@ -69,34 +275,176 @@ class ParkingSpot:
     x-coordinate, y-coordinate, and occupied status flag for any instance of the object. Each data attribute has
     getter and setter methods to retrieve it from external to the class.
 
+    The data itself lives in a SpotStore; a ParkingSpot is a view of one index of that store. A ParkingSpot created on
+    its own gets a store of its own. Two ParkingSpots viewing the same index of the same store are equal. Coordinates
+    are stored as whole millimetres: non-integer values are rounded to the nearest one.
+
     x_coordinate - int
     y_coordinate - int
     occupied - boolean
     """
 
-    def __init__(self, x_coordinate, y_coordinate):
-        self.x_coordinate = x_coordinate
-        self.y_coordinate = y_coordinate
-        self.occupied = False
+    __slots__ = ("store", "index")
+
+    def __init__(self, x_coordinate, y_coordinate, store=None):
+        if store is None:
+            store = SpotStore()
+
+        self.store = store
+        self.index = store.append(_whole_coordinate(x_coordinate), _whole_coordinate(y_coordinate))
+
+    @classmethod
+    def view(cls, store, index):
+        """Return a ParkingSpot viewing an existing entry of a SpotStore."""
+        parking_spot = cls.__new__(cls)
+        parking_spot.store = store
+        parking_spot.index = index
+        return parking_spot
+
+    def __eq__(self, other):
+        if not isinstance(other, ParkingSpot):
+            return NotImplemented
+
+        return self.store is other.store and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
 
     def get_x_coordinate(self):
-        return self.x_coordinate
+        return self.store.x_coordinates[self.index]
 
     def get_y_coordinate(self):
-        return self.y_coordinate
+        return self.store.y_coordinates[self.index]
 
     def get_occupied_status(self):
-        return self.occupied
+        return self.store.occupied[self.index] == 1
 
     def set_occupied_status(self):
-        if not self.occupied:
-            self.occupied = True
+        if not self.store.occupied[self.index]:
+            self.store.occupied[self.index] = 1
 
-        elif self.occupied:
-            self.occupied = False
+        elif self.store.occupied[self.index]:
+            self.store.occupied[self.index] = 0
 
         return
 
+    x_coordinate = property(get_x_coordinate)
+    y_coordinate = property(get_y_coordinate)
+    occupied = property(get_occupied_status)
+
+
+class FreeSpotIndex:
+    """
+    This class is a uniform grid-bucket spatial index over the unoccupied parking spots of a path. Each spot is filed
+    under the grid cell that contains it, and a nearest-free query searches rings of cells outward from the query
+    point, stopping as soon as no unsearched cell can hold a closer spot. Spots leave the index when they become
+    occupied (remove) and come back when they are freed (add).
+
+    Queries return exactly the spot a linear scan over the path would: the one with the smallest distance and, among
+    equal distances, the one that comes first in the parking spot list.
+
+    parking_spots: List<ParkingSpot>
+    cell_size: int
+    """
+
+    def __init__(self, parking_spots, cell_size=None):
+        self.parking_spots = list(parking_spots)
+        self.spot_x = [ps.get_x_coordinate() for ps in self.parking_spots]
+        self.spot_y = [ps.get_y_coordinate() for ps in self.parking_spots]
+
+        self.min_x = min(self.spot_x, default=0)
+        self.min_y = min(self.spot_y, default=0)
+        width = max(self.spot_x, default=0) - self.min_x + 1
+        height = max(self.spot_y, default=0) - self.min_y + 1
+
+        # aim for roughly two spots per cell
+        if cell_size is None:
+            cell_size = max(1, int(math.sqrt(width * height * 2 / max(1, len(self.parking_spots)))))
+
+        self.cell_size = cell_size
+        self.columns = width // cell_size + 1
+        self.rows = height // cell_size + 1
+        self.buckets = [set() for _ in range(self.columns * self.rows)]
+        self.free_count = 0
+
+        for idx, ps in enumerate(self.parking_spots):
+            if not ps.get_occupied_status():
+                self.add(idx)
+
+    def __len__(self):
+        return self.free_count
+
+    def _bucket(self, idx):
+        column = (self.spot_x[idx] - self.min_x) // self.cell_size
+        row = (self.spot_y[idx] - self.min_y) // self.cell_size
+        return self.buckets[column * self.rows + row]
+
+    def add(self, idx):
+        """Put the parking spot at position idx of the path back into the index (it is free)."""
+        bucket = self._bucket(idx)
+        if idx not in bucket:
+            bucket.add(idx)
+            self.free_count += 1
+
+    def remove(self, idx):
+        """Take the parking spot at position idx of the path out of the index (it is occupied)."""
+        bucket = self._bucket(idx)
+        if idx in bucket:
+            bucket.remove(idx)
+            self.free_count -= 1
+
+    def nearest(self, x_coordinate, y_coordinate):
+        """
+        This method returns the path position of the closest free parking spot to (x_coordinate, y_coordinate), or
+        None if every spot is occupied.
+
+        Time Complexity: O(R^2 + K) for R searched rings holding K spots, instead of O(S) for a linear scan. Rings
+        that do not reach the grid are skipped, so R is at most the size of the grid in cells wherever the query point
+        is.
+        """
+        if not self.free_count:
+            return None
+
+        cell_size = self.cell_size
+        column = int((x_coordinate - self.min_x) // cell_size)
+        row = int((y_coordinate - self.min_y) // cell_size)
+
+        # rings needed to reach every cell of the grid from the query cell
+        max_ring = max(column, self.columns - 1 - column, row, self.rows - 1 - row)
+
+        spot_x, spot_y, buckets, rows = self.spot_x, self.spot_y, self.buckets, self.rows
+        best_distance = None
+        best_idx = None
+
+        # a query point off the grid starts at the first ring that reaches the grid (its Chebyshev distance in cells
+        # to the grid), instead of walking the empty rings in between
+        ring = max(-column, column - (self.columns - 1), -row, row - (rows - 1), 0)
+        while ring <= max_ring:
+            # every cell of this ring is at least (ring - 1) * cell_size away from the query point
+            if best_distance is not None and best_distance <= ((ring - 1) * cell_size) ** 2:
+                break
+
+            for c in range(max(column - ring, 0), min(column + ring, self.columns - 1) + 1):
+                edge = c == column - ring or c == column + ring
+                if edge:
+                    cells = range(max(row - ring, 0), min(row + ring, rows - 1) + 1)
+                else:
+                    cells = [r for r in (row - ring, row + ring) if 0 <= r < rows]
+
+                for r in cells:
+                    for idx in buckets[c * rows + r]:
+                        dx = spot_x[idx] - x_coordinate
+                        dy = spot_y[idx] - y_coordinate
+                        distance = dx * dx + dy * dy
+                        if best_distance is None or distance < best_distance or \
+                                (distance == best_distance and idx < best_idx):
+                            best_distance = distance
+                            best_idx = idx
+
+            ring += 1
+
+        return best_idx
+
 
 class PuckLibrary:
     """
@@ -107,14 +455,79 @@ class PuckLibrary:
     check and fill gaps appropriately.
 
     parking_spots: List<ParkingSpot>
-    pucks: List<Pucks>
+    pucks: Deque<Pucks>
+    layout: BoardLayout
+    events: NullSink, ConsoleSink or JsonlSink
     """
 
-    def __init__(self):
+    def __init__(self, events=None):
+
+        self.events = NullSink() if events is None else events  # where progress events go (see events.py)
 
         self.parking_spots = []  # start of array is tail of the path; end of array is head of the path.
 
-        self.pucks = []
+        # contiguous storage behind the pucks and parking spots this library creates
+        self.puck_store = PuckStore()
+        self.spot_store = SpotStore()
+
+        self.pucks = collections.deque()  # queue of pucks; end of the queue is the head of the path.
+
+        self.layout = None  # BoardLayout the parking spots were generated from
+
+        self.free_spot_index = None  # built on first use from the occupied state of self.parking_spots
+
+        # occupancy bitmap: bit i is set when self.parking_spots[i] is occupied. It is (re)built from the parking
+        # spots whenever their number changes, and kept up to date by move_puck and fill_gaps.
+        self.occupancy = 0
+        self.spot_positions = {}  # ParkingSpot -> position along the path
+        self.tracked_spot_count = 0
+        self.spots_in_store = True  # parking_spots[i] is entry i of spot_store, so arrays can be used directly
+
+        # precomputed nearest-spot lookup table, when enabled with use_nearest_spot_table
+        self.nearest_spot_table = None
+        self.nearest_spot_table_options = None
+
+        # True while the pucks sit on the last k parking spots in queue order (pucks[i] on spot S - k + i), as _compact
+        # leaves them; add_puck, remove_puck and advance rely on it and keep it that way
+        self.path_compacted = False
+
+        self.last_assignment_conflicts = 0  # pucks whose nearest spot was taken during the last assign_all
+        self.last_assignment_report = None  # costs of the last assign_all, see get_assignment_report
+
+        self.instrumentation = None  # Instrumentation attached by instrument(), if any
+
+    @contextlib.contextmanager
+    def instrument(self, instrumentation=None):
+        """
+        This method is a context manager that records per-phase wall time and hot-path counters (see
+        instrumentation.py) for everything this library does inside the with block, and yields the Instrumentation
+        holding them. Its snapshot() method returns them as a dict.
+
+        Instrumentation works by temporarily wrapping methods of this instance, so there is no cost at all while it
+        is not attached.
+        """
+        instrumentation = self.enable_instrumentation(instrumentation)
+        try:
+            yield instrumentation
+        finally:
+            self.disable_instrumentation()
+
+    def enable_instrumentation(self, instrumentation=None):
+        """This method attaches an Instrumentation (a new one by default) to this library and returns it."""
+        self.disable_instrumentation()
+        self.instrumentation = Instrumentation() if instrumentation is None else instrumentation
+        self.instrumentation.attach(self)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        """This method detaches the current Instrumentation, if any. Its counters stay readable."""
+        if self.instrumentation is not None:
+            self.instrumentation.detach(self)
+            self.instrumentation = None
+
+    def get_instrumentation_snapshot(self):
+        """Return the snapshot dict of the attached Instrumentation, or None if instrumentation is disabled."""
+        return None if self.instrumentation is None else self.instrumentation.snapshot()
 
     def get_valid_parking_spots(self):
         return self.parking_spots
@@ -122,39 +535,84 @@ class PuckLibrary:
     def get_current_pucks(self):
         return self.pucks
 
-    def populate_pucks(self):
+    def get_puck_locations(self):
+        """Return the (x, y) coordinates of every puck, in queue order."""
+        return [(puck.get_x_coordinate(), puck.get_y_coordinate()) for puck in self.pucks]
+
+    def populate_pucks(self, count=None, rng=None):
         """
-        This method randomly generates x & y coordinates for a random number of pucks and appends them to our
-        internal list.
+        This method randomly generates x & y coordinates for a number of pucks anywhere on the board and appends them
+        to our internal list. Unless a count is given, the number of pucks is random, between 1 and the number of
+        parking spots of the board layout (1 - 9 for the default board). An instance of random.Random can be passed
+        as rng for reproducible boards.
 
-        Time Complexity: O(1), Space complexity: O(1)
-        Explanation: Range is defined, # of pucks will never surpass 9 or grow with input size of program (as is).
+        Time Complexity: O(N), Space complexity: O(N)
+        Explanation: One puck is created per generated position.
         """
-        for puck in range(random.randint(1, 9)):
-            new_puck = Puck()
-            new_puck.set_x_coordinate(random.randint(0, 480))
-            new_puck.set_y_coordinate(random.randint(0, 480))
+        layout = self.layout if self.layout is not None else DEFAULT_LAYOUT
+        for x_coordinate, y_coordinate in layout.generate_pucks(count, rng):
+            new_puck = Puck(self.puck_store)
+            new_puck.set_x_coordinate(x_coordinate)
+            new_puck.set_y_coordinate(y_coordinate)
             self.pucks.append(new_puck)
 
-        print("List of populated original pucks:", self.pucks)
-        print("# of pucks:", len(self.pucks), "\n")
+        if self.events.enabled:
+            self.events.emit("pucks_populated", pucks=self.get_puck_locations())
         return
 
-    def populate_parking_spots(self):
+    def load_pucks(self, coordinates):
+        """
+        This method appends a puck for every (x, y) pair of coordinates to our internal list, in order, the same way
+        populate_pucks does for random positions (for example to replay a recorded board). Returns the new pucks.
+
+        Time Complexity: O(N), Space complexity: O(N)
         """
-        This method generates our list of Parking Spots as objects and appends them to our internal Parking Spot list.
+        new_pucks = []
+        for x_coordinate, y_coordinate in coordinates:
+            new_puck = Puck(self.puck_store)
+            new_puck.set_x_coordinate(x_coordinate)
+            new_puck.set_y_coordinate(y_coordinate)
+            new_pucks.append(new_puck)
 
-        Time Complexity: O(1), Space complexity: O(1)
-        Explanation: # of parking spots remains 9. Space uptake will not grow with input size of program (as is).
+        self.pucks.extend(new_pucks)
+        return new_pucks
 
+    def populate_parking_spots(self, layout=None):
         """
-        for ps in [[180, 60], [300, 60], [420, 60], [420, 180], [300, 180], [180, 180],
-                   [180, 300], [300, 300], [420, 300]]:
-            ps_obj = ParkingSpot(ps[0], ps[1])
+        This method generates our list of Parking Spots as objects along the serpentine path of a board layout and
+        appends them to our internal Parking Spot list. Without a layout, the 3x3 path of the problem statement is
+        used.
+
+        Time Complexity: O(S), Space complexity: O(S)
+        Explanation: One parking spot is created per spot of the layout (9 for the default board).
+
+        """
+        self.layout = layout if layout is not None else DEFAULT_LAYOUT
+        for x_coordinate, y_coordinate in self.layout.parking_spot_coordinates():
+            ps_obj = ParkingSpot(x_coordinate, y_coordinate, self.spot_store)
             self.parking_spots.append(ps_obj)
 
-        print("List of parking spots:", self.parking_spots)
-        print("# of parking spots:", len(self.parking_spots), "\n")
+        if self.events.enabled:
+            self.events.emit("parking_spots_populated",
+                             parking_spots=[(ps.get_x_coordinate(), ps.get_y_coordinate())
+                                            for ps in self.parking_spots])
+        return
+
+    def clear_pucks(self):
+        """
+        This method removes every puck from the board and frees the parking spots they were on, so the library can be
+        used for another board of the same layout. The parking spots and everything built for them (free spot index,
+        nearest-spot lookup table) are kept.
+
+        Time Complexity: O(K) for K occupied parking spots
+        """
+        for idx in _set_bits(self.get_occupancy()):
+            parking_spot = self.parking_spots[idx]
+            parking_spot.set_occupied_status()
+            self._record_occupancy(parking_spot)
+
+        self.pucks.clear()
+        self.puck_store = PuckStore()
         return
 
     def do_work(self, puck_object):
@@ -165,7 +623,8 @@ class PuckLibrary:
         Explanation: Work function checks and sets a boolean. Operation is constant time.
         """
         puck_object.set_work_complete_status()
-        print("Work is being processed on this puck!")
+        if self.events.enabled:
+            self.events.emit("work_done", puck=(puck_object.get_x_coordinate(), puck_object.get_y_coordinate()))
         return
 
     def move_puck(self, puck_object, parking_spot):
@@ -180,21 +639,142 @@ class PuckLibrary:
         puck_object.set_x_coordinate(parking_spot.get_x_coordinate())
         puck_object.set_y_coordinate(parking_spot.get_y_coordinate())
         parking_spot.set_occupied_status()
+        self._record_occupancy(parking_spot)
+        self.path_compacted = False
         return
 
-    def calculate_closest_parking_spot(self, puck_object):
+    def get_free_spot_index(self):
         """
-        This method takes in a puck instance and calculates the Euclidean distance between the pucks' current position
-        and all parking spots to determine the closest available parking spot to it (ie: not occupied and closest).
+        This method returns the spatial index over our unoccupied parking spots, (re)building it if the list of
+        parking spots has changed since it was built.
 
-        Time Complexity: O(1), Space Complexity: O(1)
-        Explanation: Move function uses set operations that are constant time.
+        Time Complexity: O(1) once built, O(S) to build.
+        """
+        self._sync_spot_state()
+        if self.free_spot_index is None:
+            self.free_spot_index = FreeSpotIndex(self.parking_spots)
+
+        return self.free_spot_index
+
+    def get_occupancy(self):
+        """Return the occupancy bitmap of the parking spots (bit i set when parking spot i is occupied)."""
+        self._sync_spot_state()
+        return self.occupancy
+
+    def _sync_spot_state(self):
+        """Rebuild the occupancy bitmap and spot positions if parking spots were added since they were built."""
+        if self.tracked_spot_count == len(self.parking_spots):
+            return
+
+        if getattr(self.parking_spots, "store", None) is self.spot_store and \
+                len(self.spot_store) == len(self.parking_spots):
+            # a lazy sequence of the views of our own store, in store order (see snapshot.ViewSequence): positions are
+            # the store indices, so the parking spots do not have to be created
+            self.spot_positions = {}
+            self.spots_in_store = True
+        else:
+            self.spot_positions = {ps: idx for idx, ps in enumerate(self.parking_spots)}
+            self.spots_in_store = len(self.spot_store) == len(self.parking_spots) and all(
+                ps.store is self.spot_store and ps.index == idx for idx, ps in enumerate(self.parking_spots))
+
+        if self.spots_in_store:
+            occupied = self.spot_store.occupied
+        else:
+            occupied = bytearray(ps.get_occupied_status() for ps in self.parking_spots)
+
+        self.occupancy = int(bytes(occupied[::-1]).translate(_OCCUPANCY_DIGITS) or b"0", 2)
+        self.free_spot_index = None
+        self.nearest_spot_table = None
+        self.tracked_spot_count = len(self.parking_spots)
+
+    def _record_occupancy(self, parking_spot):
+        """Update the occupancy bitmap and free spot index to match the current occupied status of a parking spot."""
+        self._sync_spot_state()
+        if self.spots_in_store and parking_spot.store is self.spot_store:
+            idx = parking_spot.index
+        else:
+            idx = self.spot_positions.get(parking_spot)
+            if idx is None:
+                return
+
+        if parking_spot.get_occupied_status():
+            self.occupancy |= 1 << idx
+            if self.free_spot_index is not None:
+                self.free_spot_index.remove(idx)
+        else:
+            self.occupancy &= ~(1 << idx)
+            if self.free_spot_index is not None:
+                self.free_spot_index.add(idx)
+
+    def _occupied_statuses(self):
+        """Return the occupied status of every parking spot, in path order, as a list of booleans."""
+        if not self.parking_spots:
+            return []
+
+        occupancy_bits = format(self.get_occupancy(), "0{}b".format(len(self.parking_spots)))
+        return [bit == "1" for bit in reversed(occupancy_bits)]
+
+    def use_nearest_spot_table(self, cell_size=None, candidate_count=8, cache_dir=None):
+        """
+        This method turns on the precomputed nearest-spot lookup table (see nearest_lookup.py) for closest parking
+        spot queries. The table for our layout is taken from the in-memory cache, or from cache_dir on disk when
+        given, and only built if neither has it. It is rebuilt automatically if the parking spots change.
 
+        Time Complexity: O(1) when cached, O(C * S) to build a raster of C cells.
+        """
+        self.nearest_spot_table_options = (cell_size, candidate_count, cache_dir)
+        self.nearest_spot_table = None
+        return self.get_nearest_spot_table()
+
+    def get_nearest_spot_table(self):
+        """Return the nearest-spot lookup table for our parking spots, or None if it is not turned on."""
+        self._sync_spot_state()
+        if self.nearest_spot_table is None and self.nearest_spot_table_options is not None and self.parking_spots:
+            cell_size, candidate_count, cache_dir = self.nearest_spot_table_options
+            spot_x, spot_y = self._spot_coordinates()
+            if self.layout is not None:
+                width, height = self.layout.get_width(), self.layout.get_height()
+            else:
+                width, height = max(0, int(spot_x.max())), max(0, int(spot_y.max()))
+
+            self.nearest_spot_table = nearest_lookup.get_table(spot_x, spot_y, width, height, cell_size,
+                                                               candidate_count, cache_dir)
+
+        return self.nearest_spot_table
+
+    def find_closest_parking_spot(self, puck_object):
         """
+        This method returns the closest unoccupied parking spot to a puck instance, or None if all are occupied. When
+        the nearest-spot lookup table is turned on, it is tried first; otherwise (or when the table cannot tell) the
+        lookup goes through the free spot index, so it does not scan every parking spot.
 
-        # find parking spot that has minimum distance from current puck position
+        Time Complexity: O(1) with the lookup table in the common case, otherwise sublinear in the number of parking
+        spots for typical boards (see FreeSpotIndex.nearest).
+        """
+        if self.nearest_spot_table_options is not None:
+            table = self.get_nearest_spot_table()
+            if table is not None and self.spots_in_store:
+                store = self.spot_store
+                idx = table.lookup(puck_object.get_x_coordinate(), puck_object.get_y_coordinate(),
+                                   store.x_coordinates, store.y_coordinates, store.occupied)
+                if idx is not None:
+                    return self.parking_spots[idx]
+
+        idx = self.get_free_spot_index().nearest(puck_object.get_x_coordinate(), puck_object.get_y_coordinate())
+        if idx is None:
+            return None
+
+        return self.parking_spots[idx]
+
+    def scan_closest_parking_spot(self, puck_object):
+        """
+        This method finds the closest unoccupied parking spot to a puck instance by computing the Euclidean distance to
+        every parking spot. It is the reference the free spot index is checked against.
+
+        Time Complexity: O(S)
+        """
         min_dist = float("inf")
-        min_parking_spot = float("inf")
+        min_parking_spot = None
         for parking_spot in self.parking_spots:
             distance = math.dist([parking_spot.get_x_coordinate(), parking_spot.get_y_coordinate()],
                                  [puck_object.get_x_coordinate(), puck_object.get_y_coordinate()])
@@ -203,117 +783,333 @@ class PuckLibrary:
                 min_dist = distance
                 min_parking_spot = parking_spot
 
-        # this print statement will give us the original randomized location of the pucks and show us the nearest spot
-        # assigned to it.
+        return min_parking_spot
+
+    def calculate_closest_parking_spot(self, puck_object):
+        """
+        This method takes in a puck instance and determines the closest available parking spot to it (ie: not
+        occupied and closest by Euclidean distance), then moves the puck there.
+
+        Time Complexity: Sublinear in the number of parking spots, Space Complexity: O(1)
+        Explanation: The lookup goes through the free spot index, which only searches grid cells near the puck.
+
+        """
+
+        # find parking spot that has minimum distance from current puck position
+        min_parking_spot = self.find_closest_parking_spot(puck_object)
+        if min_parking_spot is None:
+            raise ValueError("There is no unoccupied parking spot left for this puck.")
 
-        print("Original Location:", (puck_object.get_x_coordinate(), puck_object.get_y_coordinate()), "Nearest Spot:",
-              (min_parking_spot.get_x_coordinate(), min_parking_spot.get_y_coordinate()))
+        original_location = (puck_object.get_x_coordinate(), puck_object.get_y_coordinate())
 
         # move puck to nearest spot
         self.move_puck(puck_object, min_parking_spot)
 
-        # this print statement shows that the puck has now been assigned to the parking spot.
-        print("New Location:", (puck_object.get_x_coordinate(), puck_object.get_y_coordinate()))
+        # report the original randomized location of the puck, the nearest spot assigned to it and its new location
+        if self.events.enabled:
+            self.events.emit("puck_assigned", original=original_location,
+                             parking_spot=(min_parking_spot.get_x_coordinate(), min_parking_spot.get_y_coordinate()),
+                             location=(puck_object.get_x_coordinate(), puck_object.get_y_coordinate()))
         return
 
+    def assign_all(self, pucks=None, mode="greedy", nearest=None):
+        """
+        This method takes in a list of puck instances (defaults to our internal list) and assigns every one of them to
+        an unoccupied parking spot, using one of these modes:
+
+        greedy - each puck gets its closest unoccupied parking spot. The result is the same as calling
+            calculate_closest_parking_spot on each puck in order: earlier pucks get first pick, and ties go to the spot
+            found first in the parking spot list.
+        total - the pucks are assigned so that the sum of the Euclidean distances they move is as small as possible
+            (Hungarian method, see assignment.py). The result does not depend on the order of the pucks.
+        bottleneck - the pucks are assigned so that the longest distance any puck moves is as small as possible,
+            and with the least total distance among those assignments.
+
+        The cost of the assignment made and of the greedy one is kept in last_assignment_report (see
+        get_assignment_report), so the modes can be compared. nearest is only used by assign_batch, to pass in the
+        nearest spot of every puck computed for a whole batch of libraries at once.
+
+        For greedy, the puck x spot distance matrix is computed with NumPy in row blocks, and each puck first tries
+        the spot that is nearest overall. Only when that spot has already been taken by an earlier puck (a conflict)
+        do we search that puck's row again for the nearest spot that is still free.
+
+        Time Complexity: greedy O(N * S) vectorized, plus O(S) per conflict; total and bottleneck O(N^2 * F) worst case
+        for F free spots. Space Complexity: greedy O(B * S) for a block of B rows, otherwise O(N * F).
+        Explanation: Greedy distances are squared integer distances, which rank spots the same way Euclidean distance
+        does.
+        """
+        if mode not in ASSIGNMENT_MODES:
+            raise ValueError("Unknown assignment mode: {!r}".format(mode))
+
+        pucks = list(self.pucks if pucks is None else pucks)
+        if not pucks:
+            return []
+
+        spot_x, spot_y = self._spot_coordinates()
+        occupied = np.array(self._occupied_statuses(), dtype=bool)
+        if len(pucks) > len(occupied) - int(occupied.sum()):
+            raise ValueError("There are more pucks than unoccupied parking spots.")
+
+        puck_x, puck_y = self._puck_coordinates(pucks)
+        greedy, self.last_assignment_conflicts = _greedy_assignment(puck_x, puck_y, spot_x, spot_y, occupied, nearest)
+
+        if mode == "greedy":
+            positions = greedy
+        else:
+            free = np.flatnonzero(~occupied)
+            distances = np.hypot(np.subtract.outer(puck_x, spot_x[free]), np.subtract.outer(puck_y, spot_y[free]))
+            solve = assignment.linear_sum_assignment if mode == "total" else assignment.bottleneck_assignment
+            positions = free[solve(distances)]
+
+        moves = np.hypot(puck_x - spot_x[positions], puck_y - spot_y[positions])
+        greedy_moves = moves if mode == "greedy" else np.hypot(puck_x - spot_x[greedy], puck_y - spot_y[greedy])
+        self.last_assignment_report = {
+            "mode": mode, "pucks": len(pucks), "total_distance": float(moves.sum()),
+            "max_distance": float(moves.max()), "greedy_total_distance": float(greedy_moves.sum()),
+            "greedy_max_distance": float(greedy_moves.max()),
+            "total_distance_saved": float(greedy_moves.sum() - moves.sum()),
+            "max_distance_saved": float(greedy_moves.max() - moves.max())}
+
+        assigned = []
+        for puck, spot_idx in zip(pucks, positions.tolist()):
+            parking_spot = self.parking_spots[spot_idx]
+            self.move_puck(puck, parking_spot)
+            assigned.append(parking_spot)
+
+        return assigned
+
+    @classmethod
+    def assign_batch(cls, puck_libraries):
+        """
+        This method greedily assigns the pucks of several libraries that share the same parking spots (such as
+        boards of one layout served together), with the same result as calling assign_all on each of them. The
+        nearest spot of every puck of every library is found in a single vectorized distance computation, so a batch
+        of small boards costs about as much as one board with all of their pucks; only the conflicts are then resolved
+        board by board.
+
+        Returns the list of assigned parking spots of each library.
+
+        Time Complexity: O(N * S) vectorized for N pucks in total, plus O(S) per conflict.
+        """
+        puck_libraries = list(puck_libraries)
+        if not puck_libraries:
+            return []
+
+        spot_x, spot_y = puck_libraries[0]._spot_coordinates()
+        for puck_library in puck_libraries[1:]:
+            other_x, other_y = puck_library._spot_coordinates()
+            if not (np.array_equal(spot_x, other_x) and np.array_equal(spot_y, other_y)):
+                raise ValueError("Only libraries with the same parking spots can be assigned as a batch.")
+
+        coordinates = [puck_library._puck_coordinates(list(puck_library.pucks)) for puck_library in puck_libraries]
+        puck_x = np.concatenate([x for x, _ in coordinates])
+        puck_y = np.concatenate([y for _, y in coordinates])
+        nearest = _nearest_spots(puck_x, puck_y, spot_x, spot_y, np.zeros(len(spot_x), dtype=bool))
+
+        assigned = []
+        start = 0
+        for puck_library, (x, _) in zip(puck_libraries, coordinates):
+            stop = start + len(x)
+            assigned.append(puck_library.assign_all(nearest=nearest[start:stop]))
+            start = stop
+
+        return assigned
+
+    def get_assignment_report(self):
+        """
+        Return the costs of the last assign_all call: total and longest Euclidean distance moved by the pucks, the
+        same for the greedy assignment, and how much the chosen mode saved compared to greedy (0 for greedy itself).
+        """
+        return self.last_assignment_report
+
+    def _spot_coordinates(self):
+        """Return the x and y coordinates of every parking spot as two int64 arrays, in path order."""
+        self._sync_spot_state()
+        if self.spots_in_store:
+            return (np.frombuffer(self.spot_store.x_coordinates, dtype=np.int64).copy(),
+                    np.frombuffer(self.spot_store.y_coordinates, dtype=np.int64).copy())
+
+        spot_x = np.fromiter((ps.get_x_coordinate() for ps in self.parking_spots), dtype=np.int64,
+                             count=len(self.parking_spots))
+        spot_y = np.fromiter((ps.get_y_coordinate() for ps in self.parking_spots), dtype=np.int64,
+                             count=len(self.parking_spots))
+        return spot_x, spot_y
+
+    def _puck_coordinates(self, pucks):
+        """Return the x and y coordinates of a list of pucks as two int64 arrays, in the order of the list."""
+        store = self.puck_store
+        if all(puck.store is store for puck in pucks):
+            indices = np.fromiter((puck.index for puck in pucks), dtype=np.intp, count=len(pucks))
+            return (np.frombuffer(store.x_coordinates, dtype=np.int64)[indices],
+                    np.frombuffer(store.y_coordinates, dtype=np.int64)[indices])
+
+        puck_x = np.fromiter((puck.get_x_coordinate() for puck in pucks), dtype=np.int64, count=len(pucks))
+        puck_y = np.fromiter((puck.get_y_coordinate() for puck in pucks), dtype=np.int64, count=len(pucks))
+        return puck_x, puck_y
+
     def check_gaps(self):
         """
         This method checks to see if our pucks have gaps between them. If so, we return True. If not, we return False.
 
-        Time Complexity: Single for loops are generally O(N), however, this may actually be O(1).
+        Time Complexity: O(1) (a few integer operations on the occupancy bitmap)
 
-        Explanation: We are looping through a list of parking spots. However, the number of parking spots will always
-        be 9, so this may be O(1) on the understanding that time complexity is really about scalability and growth of
-        our algorithm. Getter method is O(1).
+        Explanation: There are no gaps exactly when the occupied parking spots are the last k spots of the path (the
+        ones at the head), where k is the popcount of the occupancy bitmap. That is a single comparison of the bitmap
+        against the mask with the top k bits set, so we no longer loop through every parking spot.
         """
 
         # if we encounter a puck and then an empty parking spot, we know there's a gap.
-        flag = False
-        for val in self.parking_spots:
-            if val.get_occupied_status():
-                flag = True
+        occupancy = self.get_occupancy()
+        if not occupancy:
+            return False
+
+        spot_count = len(self.parking_spots)
+        if occupancy.bit_length() != spot_count:
+            return True
 
-            if flag and (not val.get_occupied_status()):
-                return True
+        return occupancy != _head_mask(spot_count, occupancy.bit_count())
 
-        return False
+    def _compact(self):
+        """
+        This method moves every puck forward to the head of the path, closing any gaps. The occupied spots become the
+        last k spots of the path and the pucks are placed on them in queue order, tail first.
+
+        Time Complexity: O(K) for the K parking spots and pucks that change (plus bitmap operations).
+        """
+        occupancy = self.get_occupancy()
+        spot_count = len(self.parking_spots)
+        occupied_frequency = occupancy.bit_count()
+        adjusted = _head_mask(spot_count, occupied_frequency)
+
+        # only the spots whose occupied status differs between the two bitmaps have to be updated
+        for idx in _set_bits(occupancy ^ adjusted):
+            parking_spot = self.parking_spots[idx]
+            parking_spot.set_occupied_status()
+            self._record_occupancy(parking_spot)
+
+        # set the coordinates of each puck to their appropriate parking spot
+        for puck, idx in zip(self.pucks, range(spot_count - occupied_frequency, spot_count)):
+            parking_spot = self.parking_spots[idx]
+            puck.set_x_coordinate(parking_spot.get_x_coordinate())
+            puck.set_y_coordinate(parking_spot.get_y_coordinate())
+
+        self.path_compacted = True
 
     def fill_gaps(self):
         """
         If there are gaps between our pucks, we fill those gaps by moving all pucks forward as far as possible.
 
-        Time Complexity: O(N), Space Complexity: O(N)
-        Explanation: At most, we loop through a array at some points in the method. There are no nested for loops. We
-        also store statuses or the new puck orientations in an array based on the original array size we're looking at,
-        so any additional storage would be based on the number of pucks or parking spots accordingly.
+        Time Complexity: O(K) to compact, Space Complexity: O(1)
+        Explanation: The compacted occupancy is known up front (the top k bits of the bitmap), so only the parking
+        spots whose status changes are touched, and only the k pucks are moved. The status lists of the
+        "gaps_filled" event are only built when an event sink is listening.
         """
         gap_fill_flag = self.check_gaps()
 
         if gap_fill_flag:
 
-            # get occupied state of each parking spot - easier to read and look at for printing & debugging purposes
-            occupied_state = []
-            for ps in self.parking_spots:
-                occupied_state.append(ps.get_occupied_status())
+            if not self.events.enabled:
+                self._compact()
+                return
 
-            print("Status of all occupied spots:", occupied_state, "\n")
+            # get occupied state of each parking spot before and after - easier to read for debugging purposes
+            occupied_before = self._occupied_statuses()
+            self._compact()
+            self.events.emit("gaps_filled", occupied_before=occupied_before,
+                             occupied_after=self._occupied_statuses(),
+                             occupied_spots=[(ps.get_x_coordinate(), ps.get_y_coordinate())
+                                             for ps in self.parking_spots if ps.get_occupied_status()],
+                             pucks=self.get_puck_locations())
 
-            # how many spots are occupied
-            occupied_frequency = occupied_state.count(True)
-            print("Frequency of occupied spots:", occupied_frequency, "\n")
-
-            # new array used to reorient all pucks to right-align to end of path and fill gaps
-            adjusted_gap_array = [False for _ in range(len(self.parking_spots))]
-            print("New potential adjustments array: ", adjusted_gap_array, "\n")
-
-            # loop backwards in the array (head of the path) and fill until there are no pucks left
-            for idx in range(len(adjusted_gap_array) - 1, -1, -1):
-                if occupied_frequency >= 1:
-                    adjusted_gap_array[idx] = True
-                    occupied_frequency -= 1
+        return
 
-            print("Removing gaps between pucks & end of path:", adjusted_gap_array, "\n")
+    def _ensure_path_compacted(self):
+        """
+        Make sure the pucks sit on the last k parking spots in queue order before an incremental update, compacting
+        the path once if they do not (for example after assign_all left no gaps but a different order). Returns the
+        number of pucks.
+        """
+        puck_count = len(self.pucks)
+        if self.get_occupancy().bit_count() != puck_count:
+            raise ValueError("Every puck has to be on a parking spot before the board can be updated incrementally.")
 
-            # update every parking spot to appropriate occupied status
-            for idx in range(len(self.parking_spots)):
-                if adjusted_gap_array[idx]:
-                    if not self.parking_spots[idx].get_occupied_status():
-                        self.parking_spots[idx].set_occupied_status()
+        if not self.path_compacted:
+            self._compact()
 
-                elif not adjusted_gap_array[idx]:
-                    if self.parking_spots[idx].get_occupied_status():
-                        self.parking_spots[idx].set_occupied_status()
+        return puck_count
 
-            # verify all parking spots are appropriately marked as occupied or not
-            print("New list of occupied states of parking spots:")
-            for val in self.parking_spots:
-                print(val.get_occupied_status())
+    def add_puck(self, x_coordinate, y_coordinate):
+        """
+        This method adds a puck arriving at (x, y) to a board between work cycles and returns the parking spot it was
+        given. The result is the same as appending the puck to the tail of the queue, assigning it to its closest
+        parking spot and compacting the path again, but only the new puck moves: it takes the free parking spot just
+        behind the current tail of the path.
 
-            print()
+        Time Complexity: O(1) (one move and one occupancy update)
+        """
+        puck_count = self._ensure_path_compacted()
+        spot_count = len(self.parking_spots)
+        if puck_count >= spot_count:
+            raise ValueError("There are no unoccupied parking spots.")
+
+        puck = Puck(self.puck_store)
+        puck.set_x_coordinate(x_coordinate)
+        puck.set_y_coordinate(y_coordinate)
+        parking_spot = self.parking_spots[spot_count - puck_count - 1]
+        self.move_puck(puck, parking_spot)
+        self.pucks.appendleft(puck)
+        self.path_compacted = True
+        return parking_spot
+
+    def remove_puck(self, puck_object):
+        """
+        This method takes one of our pucks off the board between work cycles. The result is the same as removing it
+        from the queue, freeing its parking spot and compacting the path again: the pucks behind it each move forward
+        one parking spot, and the tail parking spot is freed.
 
-            # set the coordinates of each puck to their appropriate parking spot
-            tracker = 0
-            for idx in range(len(self.parking_spots)):
-                parking_spot = self.parking_spots[idx]
-                if parking_spot.get_occupied_status():
-                    self.pucks[tracker].set_x_coordinate(parking_spot.get_x_coordinate())
-                    self.pucks[tracker].set_y_coordinate(parking_spot.get_y_coordinate())
-                    tracker += 1
+        Time Complexity: O(J) moves for the J pucks behind the removed one (finding the puck in the queue is a single
+        C-level scan of the deque)
+        """
+        puck_count = self._ensure_path_compacted()
+        position = self.pucks.index(puck_object)
+        spot_count = len(self.parking_spots)
+
+        # puck i (i < position) moves from spot S - k + i to spot S - k + i + 1
+        first_spot = spot_count - puck_count
+        for idx, puck in enumerate(itertools.islice(self.pucks, position)):
+            parking_spot = self.parking_spots[first_spot + idx + 1]
+            puck.set_x_coordinate(parking_spot.get_x_coordinate())
+            puck.set_y_coordinate(parking_spot.get_y_coordinate())
+
+        del self.pucks[position]
+        tail_spot = self.parking_spots[first_spot]
+        tail_spot.set_occupied_status()
+        self._record_occupancy(tail_spot)
+        return
 
-            # check the parking spots that are occupied & their coordinates to verify proper gap fill.
-            for val in self.parking_spots:
-                if val.get_occupied_status():
-                    print("Occupied Parking Spot Coordinates:", (val.get_x_coordinate(), val.get_y_coordinate()))
+    def advance(self):
+        """
+        This method performs a single step of move_and_perform_work and returns the puck that was worked on: the head
+        puck is worked on and moves to the tail of the path while every other puck moves forward one parking spot.
+        Unlike move_and_perform_work, the coordinates of the pucks follow the queue after every step, so pucks can be
+        added and removed between steps. The set of occupied parking spots does not change.
 
-            print()
+        Time Complexity: O(K) coordinate updates for the K pucks that move, O(1) occupancy and queue updates
+        """
+        puck_count = self._ensure_path_compacted()
+        if not puck_count:
+            return None
 
-            # check the pucks to ensure that their coordinates align with proper parking spots that are occupied
-            for val in self.pucks:
-                print("Pucks Coordinates:", (val.get_x_coordinate(), val.get_y_coordinate()))
+        head_puck = self.pucks[-1]
+        self.do_work(head_puck)
+        self.pucks.rotate(1)
 
-            print()
+        first_spot = len(self.parking_spots) - puck_count
+        for puck, parking_spot in zip(self.pucks, self.parking_spots[first_spot:]):
+            puck.set_x_coordinate(parking_spot.get_x_coordinate())
+            puck.set_y_coordinate(parking_spot.get_y_coordinate())
 
-        return
+        return head_puck
 
     def rotate(self, arr, n):
         """
@@ -321,10 +1117,15 @@ class PuckLibrary:
         rotate the array by one index every iteration it is called (ie: the end of the array will move to the front
         and all other array members will move forward in the array by one).
 
-        Time Complexity: O(N)
-        Explanation: This function takes an array of 'n' length and loops through it. Length is subjective on our use.
+        move_and_perform_work no longer calls this method; it is kept for callers that rotate their own arrays.
+
+        Time Complexity: O(1) for a whole deque (such as our puck queue), O(N) otherwise.
+        Explanation: A deque rotates by relinking its ends; a list has to shift 'n' elements over by one.
 
         """
+        if isinstance(arr, collections.deque) and n == len(arr):
+            arr.rotate(1)
+            return
 
         # rotate array by one (end of array goes to start of array)
         x = arr[n - 1]
@@ -341,35 +1142,155 @@ class PuckLibrary:
         This method does work on the head puck, sets its' work status to complete, then rotates the array until all
         pucks have been worked on and they are back in their original positions.
 
-        Time Complexity: O(N * N)
-        Explanation: We have 'n # of pucks iterations and we rotate 'n' number of times to
-        process all pucks. Each puck will result in us rotating the entire array, thus, I propose this is O(n^2).
-        However, there is discussion to be had about the complexity being O(n) due to the fact that the number of
-        iterations is always finite and constant. At most, it will be 9 pucks, and this will never scale,
-        unless we change the number of pucks we have to work with.
+        Time Complexity: O(N)
+        Explanation: We have 'n' # of pucks iterations and each one advances the queue by a single step. The queue is
+        a deque, so moving the head puck to the tail is O(1) instead of shifting every other puck forward.
         """
-        iterations = len(self.pucks)
+        with self._work_cycle() as (queue, _):
+            # rotate through all pucks & do work on them, set their work status as True (complete).
+            for _ in range(len(queue)):
+                head_puck = queue[-1]
+                self.do_work(head_puck)
+                head_puck.set_work_complete_status()
+                queue.rotate(1)
 
-        # rotate through all pucks & do work on them, set their work status as True (complete).
-        while iterations != 0:
-            head_puck = self.pucks[-1]
-            self.do_work(head_puck)
-            head_puck.set_work_complete_status()
-            iterations -= 1
-            self.rotate(self.pucks, len(self.pucks))
+        return
+
+    @contextlib.contextmanager
+    def _work_cycle(self):
+        """
+        This method is the context manager around one work cycle. It yields the puck queue as a deque (a copy when
+        self.pucks is a plain list) and a list for the errors work raised. Afterwards the queue is written back to
+        self.pucks; if any errors were collected, the first one is raised (after all other pucks have been processed,
+        and the puck it was raised for is not marked complete), otherwise the final order is reported.
+        """
+        queue = self.pucks
+        if not isinstance(queue, collections.deque):
+            queue = collections.deque(queue)
+
+        errors = []
+        yield queue, errors
+
+        if queue is not self.pucks:
+            self.pucks[:] = queue
 
-        print()
+        if errors:
+            raise errors[0]
 
-        # display the order of pucks & their work complete status
-        for val in self.pucks:
-            print("Final Order of Pucks", (val.get_x_coordinate(), val.get_y_coordinate()), "||",
-                  "Work Complete Status:", val.get_work_complete_status())
+        self._report_final_order()
+
+    async def move_and_perform_work_async(self, work, concurrency=1, max_pending=None, move=None):
+        """
+        This method is the asynchronous version of move_and_perform_work for work that takes real time (for example
+        a pipetting step waiting on an instrument). work is a coroutine function called with the head puck. It runs
+        in the background while the queue keeps advancing, so the head puck's work and the movement of the other
+        pucks happen at the same time, as described at the top of this module.
+
+        Up to 'concurrency' pucks are worked on at once. At most 'max_pending' pucks (default: concurrency) can wait
+        for a free worker; when that many are waiting the queue stops advancing until one is picked up. An optional
+        move coroutine function is awaited with the queue before every step, to model the time a move takes. Both
+        limits must be at least 1 (ValueError otherwise).
+
+        Once all pucks have been worked on, the queue is back in its original order. If work raised for any puck, the
+        first error is raised once the cycle is over (see _work_cycle).
+
+        Time Complexity: O(N) queue steps; wall time is bounded by the slower of moving and working, not their sum.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1, got {}".format(concurrency))
+
+        if max_pending is not None and max_pending < 1:
+            raise ValueError("max_pending must be at least 1, got {}".format(max_pending))
+
+        pending = asyncio.Queue(maxsize=concurrency if max_pending is None else max_pending)
+
+        async def worker(errors):
+            while True:
+                puck = await pending.get()
+                try:
+                    await work(puck)
+                    self.do_work(puck)
+                except Exception as error:
+                    errors.append(error)
+                finally:
+                    pending.task_done()
+
+        with self._work_cycle() as (queue, errors):
+            workers = [asyncio.create_task(worker(errors)) for _ in range(concurrency)]
+            try:
+                for _ in range(len(queue)):
+                    if move is not None:
+                        await move(queue)
+
+                    # hand the head puck off to the workers (waits while too many pucks are pending), then advance
+                    await pending.put(queue[-1])
+                    queue.rotate(1)
+
+                await pending.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+
+                await asyncio.gather(*workers, return_exceptions=True)
+
+        return
+
+    def move_and_perform_work_parallel(self, work, stations=1, executor=None):
+        """
+        This method is the multi-station version of move_and_perform_work for blocking work that takes real time (for
+        example a pipetting step waiting on an instrument call). The 'stations' spots at the front of the path are all
+        work stations: the pucks parked on them are handed to the blocking work callable at the same time, on a
+        ThreadPoolExecutor, and once every station is done the queue advances by that many spots so a fresh batch of
+        pucks pulls onto the stations.
+
+        executor can be a ThreadPoolExecutor shared with other libraries; when it is None, one with a thread per
+        station is created for this call and shut down afterwards. Work status and events are only updated from the
+        calling thread, so work itself is the only code running on the pool.
+
+        Once all pucks have been worked on, each exactly once, the queue is back in its original order. Errors raised
+        by work are handled as in move_and_perform_work_async.
+
+        Time Complexity: O(N) queue steps in N / stations rounds of work; wall time is about that of a single station
+        divided by the station count.
+        """
+        if stations < 1:
+            raise ValueError("stations must be at least 1, got {}".format(stations))
+
+        owns_executor = executor is None
+        if owns_executor:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=stations)
+
+        try:
+            with self._work_cycle() as (queue, errors):
+                remaining = len(queue)
+                while remaining:
+                    # the pucks on the stations, head first, are worked on together and then all move on at once
+                    batch = [queue[-1 - station] for station in range(min(stations, remaining))]
+                    futures = [executor.submit(work, puck) for puck in batch]
+                    for puck, future in zip(batch, futures):
+                        error = future.exception()
+                        if error is None:
+                            self.do_work(puck)
+                        else:
+                            errors.append(error)
+
+                    queue.rotate(len(batch))
+                    remaining -= len(batch)
+        finally:
+            if owns_executor:
+                executor.shutdown()
 
         return
 
+    def _report_final_order(self):
+        # report the order of pucks & their work complete status
+        if self.events.enabled:
+            self.events.emit("final_order", pucks=[(val.get_x_coordinate(), val.get_y_coordinate(),
+                                                    val.get_work_complete_status()) for val in self.pucks])
+
 
 if __name__ == '__main__':
-    puck_library = PuckLibrary()
+    puck_library = PuckLibrary(ConsoleSink())
     puck_library.populate_pucks()
     puck_library.populate_parking_spots()
     for val in puck_library.pucks:
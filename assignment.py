@@ -0,0 +1,171 @@
+# Author: Ali Alameedi
+
+# Description: Optimal assignment of pucks to parking spots. The greedy assignment of PuckLibrary gives every puck, in
+#              order, the closest parking spot still free, which can push later pucks into long moves. The functions
+#              here instead solve the assignment problem over a puck x spot cost matrix: linear_sum_assignment finds
+#              the assignment with the least total cost (Hungarian method, shortest augmenting paths, vectorized over
+#              the columns with NumPy) and bottleneck_assignment the one whose longest move is as short as possible
+#              (binary search over the distances, with Hopcroft-Karp matching to test each threshold).
+
+import collections
+
+import numpy as np
+
+
+def linear_sum_assignment(cost):
+    """
+    This function takes an n x m cost matrix (n <= m) and returns, for each row, the column assigned to it so that
+    every row gets a different column and the sum of the chosen costs is as small as possible.
+
+    Time Complexity: O(n^2 * m) worst case; each step of an augmenting path search is one O(m) NumPy operation.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    rows, columns = cost.shape
+    if rows > columns:
+        raise ValueError("There are more rows than columns to assign them to.")
+
+    # potentials (u for rows, v for columns) and the row matched to each column; index 0 is a virtual column/row
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    matched_row = np.zeros(columns + 1, dtype=np.intp)
+    way = np.zeros(columns + 1, dtype=np.intp)
+
+    for row in range(1, rows + 1):
+        matched_row[0] = row
+        column = 0
+        min_reduced = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        reduced = np.full(columns + 1, np.inf)
+
+        # grow a shortest augmenting path from this row until it reaches an unmatched column
+        while True:
+            used[column] = True
+            current_row = matched_row[column]
+            reduced[1:] = cost[current_row - 1] - u[current_row] - v[1:]
+            improved = ~used & (reduced < min_reduced)
+            min_reduced[improved] = reduced[improved]
+            way[improved] = column
+
+            candidates = np.where(used, np.inf, min_reduced)
+            next_column = int(candidates.argmin())
+            delta = candidates[next_column]
+
+            u[matched_row[used]] += delta
+            v[used] -= delta
+            min_reduced[~used] -= delta
+
+            column = next_column
+            if matched_row[column] == 0:
+                break
+
+        # flip the matching along the path
+        while column:
+            previous = way[column]
+            matched_row[column] = matched_row[previous]
+            column = previous
+
+    assignment = np.empty(rows, dtype=np.intp)
+    assigned_columns = np.nonzero(matched_row[1:])[0]
+    assignment[matched_row[assigned_columns + 1] - 1] = assigned_columns
+    return assignment
+
+
+def _maximum_matching(adjacency, columns):
+    """
+    This function returns the column matched to each row (or -1) of a maximum matching of a bipartite graph given as
+    one list of columns per row (Hopcroft-Karp).
+
+    Time Complexity: O(E * sqrt(V))
+    """
+    rows = len(adjacency)
+    row_match = [-1] * rows
+    column_match = [-1] * columns
+    unreachable = rows + 1
+
+    while True:
+        # breadth first search: layer the free rows and the rows reachable from them by alternating paths
+        layer = [unreachable] * rows
+        queue = collections.deque()
+        for row in range(rows):
+            if row_match[row] == -1:
+                layer[row] = 0
+                queue.append(row)
+
+        found = False
+        while queue:
+            row = queue.popleft()
+            for column in adjacency[row]:
+                matched = column_match[column]
+                if matched == -1:
+                    found = True
+                elif layer[matched] == unreachable:
+                    layer[matched] = layer[row] + 1
+                    queue.append(matched)
+
+        if not found:
+            return row_match
+
+        # depth first search along the layers for vertex-disjoint augmenting paths (iteratively, rows can be many)
+        for start in range(rows):
+            if row_match[start] != -1:
+                continue
+
+            stack = [(start, iter(adjacency[start]))]
+            while stack:
+                row, columns_left = stack[-1]
+                for column in columns_left:
+                    matched = column_match[column]
+                    if matched == -1:
+                        # augment along the stack
+                        for path_row, _ in reversed(stack):
+                            previous = row_match[path_row]
+                            row_match[path_row] = column
+                            column_match[column] = path_row
+                            column = previous
+
+                        stack = []
+                        break
+
+                    if layer[matched] == layer[row] + 1:
+                        stack.append((matched, iter(adjacency[matched])))
+                        break
+                else:
+                    layer[row] = unreachable
+                    stack.pop()
+
+
+def bottleneck_assignment(cost):
+    """
+    This function takes an n x m cost matrix (n <= m) and returns, for each row, the column assigned to it so that
+    every row gets a different column and the largest chosen cost is as small as possible. Among those assignments it
+    returns one with the least total cost.
+
+    Time Complexity: O(log(n * m)) matchings of O(E * sqrt(n + m)), plus one linear_sum_assignment.
+    """
+    cost = np.asarray(cost)
+    rows, columns = cost.shape
+    if rows > columns:
+        raise ValueError("There are more rows than columns to assign them to.")
+
+    if rows == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # every row needs at least its cheapest column, and a full assignment exists with all columns
+    thresholds = np.unique(cost)
+    low = int(np.searchsorted(thresholds, cost.min(axis=1).max()))
+    high = len(thresholds) - 1
+    order = np.argsort(cost, axis=1, kind="stable")
+    sorted_cost = np.take_along_axis(cost, order, axis=1)
+
+    while low < high:
+        middle = (low + high) // 2
+        counts = (sorted_cost <= thresholds[middle]).sum(axis=1)
+        adjacency = [order[row, :counts[row]].tolist() for row in range(rows)]
+        if -1 in _maximum_matching(adjacency, columns):
+            low = middle + 1
+        else:
+            high = middle
+
+    bottleneck = thresholds[low]
+    penalty = float(cost.max()) * rows + 1
+    return linear_sum_assignment(np.where(cost <= bottleneck, cost, penalty))
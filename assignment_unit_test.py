@@ -0,0 +1,73 @@
+import itertools
+import random
+import unittest
+
+import numpy as np
+
+from ali_solution import Puck, PuckLibrary
+from assignment import *
+from board_layout import BoardLayout
+
+
+class AssignmentTestCase(unittest.TestCase):
+
+    def test_one(self):
+        """Test both solvers against every possible assignment of small random cost matrices, ties included."""
+        rng = np.random.default_rng(1)
+        for _ in range(200):
+            rows = int(rng.integers(1, 6))
+            columns = int(rng.integers(rows, 7))
+            cost = rng.integers(0, 15, (rows, columns)).astype(float)
+            options = [[cost[row, column] for row, column in enumerate(permutation)]
+                       for permutation in itertools.permutations(range(columns), rows)]
+
+            total = linear_sum_assignment(cost)
+            self.assertEqual(rows, len(set(total.tolist())))
+            self.assertAlmostEqual(min(sum(option) for option in options), cost[np.arange(rows), total].sum())
+
+            bottleneck = bottleneck_assignment(cost)
+            least_max = min(max(option) for option in options)
+            self.assertEqual(rows, len(set(bottleneck.tolist())))
+            self.assertEqual(least_max, cost[np.arange(rows), bottleneck].max())
+            self.assertAlmostEqual(min(sum(option) for option in options if max(option) == least_max),
+                                   cost[np.arange(rows), bottleneck].sum())
+
+    def test_two(self):
+        """Test that optimal modes never cost more than greedy, do not depend on puck order and report the
+        difference."""
+        rng = random.Random(2)
+        for _ in range(10):
+            layout = BoardLayout(6, 7, pitch=50, origin=(25, 25))
+            coordinates = list(layout.generate_pucks(30, rng))
+            reports = {}
+            for mode in ("greedy", "total", "bottleneck"):
+                for order in (coordinates, coordinates[::-1]):
+                    puck_library = PuckLibrary()
+                    puck_library.populate_parking_spots(layout)
+                    for x, y in order:
+                        puck = Puck(puck_library.puck_store)
+                        puck.set_x_coordinate(x)
+                        puck.set_y_coordinate(y)
+                        puck_library.pucks.append(puck)
+
+                    puck_library.assign_all(mode=mode)
+                    self.assertEqual(30, puck_library.get_occupancy().bit_count())
+                    reports.setdefault(mode, []).append(puck_library.get_assignment_report())
+
+            self.assertEqual(0, reports["greedy"][0]["total_distance_saved"])
+            for report in reports["total"] + reports["bottleneck"]:
+                self.assertTrue(report["total_distance"] <= report["greedy_total_distance"] + 1e-6)
+
+            self.assertAlmostEqual(reports["total"][0]["total_distance"], reports["total"][1]["total_distance"])
+            self.assertAlmostEqual(reports["bottleneck"][0]["max_distance"], reports["bottleneck"][1]["max_distance"])
+            for report in reports["bottleneck"]:
+                self.assertTrue(report["max_distance"] <= report["greedy_max_distance"])
+                self.assertTrue(report["max_distance"] <= min(r["max_distance"] for r in reports["total"]) + 1e-9)
+
+    def test_three(self):
+        """Test that an unknown mode is refused."""
+        self.assertRaises(ValueError, PuckLibrary().assign_all, [], "fastest")
+
+
+if __name__ == '__main__':
+    unittest.main()
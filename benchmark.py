@@ -0,0 +1,180 @@
+# Author: Ali Alameedi
+
+# Description: Benchmark harness for PuckLibrary. Every phase of the program (populating pucks and parking spots,
+#              assigning pucks to their closest parking spot, checking and filling gaps, and the work cycle) is timed
+#              separately on fresh boards of increasing size, with fixed seeds so runs are comparable. Results are
+#              written as JSON (operations per second, p50/p99 wall time and peak traced memory per phase and size).
+#              A stored result can be passed with --compare to flag phases that got slower.
+#
+# Usage: python benchmark.py --sizes 9,100,1000,10000 --output bench.json
+#        python benchmark.py --compare bench.json
+
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from ali_solution import PuckLibrary
+from board_layout import BoardLayout
+
+PHASES = ("populate_parking_spots", "populate_pucks", "calculate_closest_parking_spot", "check_gaps", "fill_gaps",
+          "move_and_perform_work")
+
+
+def board_layout(spot_count):
+    """Return a serpentine layout with about spot_count parking spots, as square as possible (3x3 for 9 spots)."""
+    rows = max(1, int(math.sqrt(spot_count)))
+    columns = max(1, -(-spot_count // rows))
+    return BoardLayout(rows, columns, pitch=120, origin=(60, 60))
+
+
+def run_phases(layout, puck_count, seed, clock=time.perf_counter_ns):
+    """
+    This function runs every phase once on a fresh board and returns a dict of phase -> (elapsed ns, operations),
+    where operations is the number of pucks or parking spots the phase handled.
+    """
+    puck_library = PuckLibrary()
+    rng = random.Random(seed)
+    results = {}
+
+    def timed(phase, operations, function, *args):
+        start = clock()
+        function(*args)
+        results[phase] = (clock() - start, operations)
+
+    def assign_all_one_by_one():
+        for puck in puck_library.pucks:
+            puck_library.calculate_closest_parking_spot(puck)
+
+    timed("populate_parking_spots", len(layout), puck_library.populate_parking_spots, layout)
+    timed("populate_pucks", puck_count, puck_library.populate_pucks, puck_count, rng)
+    timed("calculate_closest_parking_spot", puck_count, assign_all_one_by_one)
+    timed("check_gaps", 1, puck_library.check_gaps)
+    timed("fill_gaps", puck_count, puck_library.fill_gaps)
+    timed("move_and_perform_work", puck_count, puck_library.move_and_perform_work)
+    return results
+
+
+def peak_memory(layout, puck_count, seed):
+    """This function runs every phase once under tracemalloc and returns a dict of phase -> peak traced bytes."""
+    peaks = {}
+
+    def clock():
+        # called at the start and end of each phase: record the peak of the phase that just ended, then reset it
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        clock.calls += 1
+        if clock.calls % 2 == 0:
+            peaks[PHASES[clock.calls // 2 - 1]] = peak
+
+        return 0
+
+    clock.calls = 0
+    tracemalloc.start()
+    try:
+        run_phases(layout, puck_count, seed, clock)
+    finally:
+        tracemalloc.stop()
+
+    return peaks
+
+
+def percentile(values, fraction):
+    """Return the value at a fraction (0 - 1) of a list of values, by the nearest-rank method."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def run_benchmark(sizes, repeats=5, seed=0, puck_ratio=0.75):
+    """
+    This function times every phase 'repeats' times for every board size in sizes (numbers of parking spots), with
+    int(puck_ratio * spots) pucks (at least 1), and returns the results as a JSON-compatible dict.
+    """
+    results = {"python": platform.python_version(), "seed": seed, "repeats": repeats, "sizes": []}
+    for spot_count in sizes:
+        layout = board_layout(spot_count)
+        puck_count = max(1, int(len(layout) * puck_ratio))
+        timings = {phase: [] for phase in PHASES}
+        operations = {}
+        for repeat in range(repeats):
+            for phase, (elapsed, count) in run_phases(layout, puck_count, seed + repeat).items():
+                timings[phase].append(elapsed)
+                operations[phase] = count
+
+        peaks = peak_memory(layout, puck_count, seed)
+        phases = {}
+        for phase in PHASES:
+            p50 = percentile(timings[phase], 0.5)
+            phases[phase] = {"ops_per_second": operations[phase] * 1e9 / max(p50, 1), "p50_ns": p50,
+                             "p99_ns": percentile(timings[phase], 0.99), "peak_bytes": peaks[phase]}
+
+        results["sizes"].append({"spots": len(layout), "pucks": puck_count, "phases": phases})
+
+    return results
+
+
+def compare(current, baseline, threshold=0.25):
+    """
+    This function compares a benchmark result against a baseline result and returns a list of regressions: phases
+    whose p50 time grew by more than threshold (0.25 = 25%) on a board size present in both.
+    """
+    baseline_sizes = {(size["spots"], size["pucks"]): size["phases"] for size in baseline["sizes"]}
+    regressions = []
+    for size in current["sizes"]:
+        baseline_phases = baseline_sizes.get((size["spots"], size["pucks"]))
+        if baseline_phases is None:
+            continue
+
+        for phase, measured in size["phases"].items():
+            if phase not in baseline_phases:
+                continue
+
+            ratio = measured["p50_ns"] / max(baseline_phases[phase]["p50_ns"], 1)
+            if ratio > 1 + threshold:
+                regressions.append({"spots": size["spots"], "pucks": size["pucks"], "phase": phase,
+                                    "baseline_p50_ns": baseline_phases[phase]["p50_ns"],
+                                    "p50_ns": measured["p50_ns"], "ratio": ratio})
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every PuckLibrary phase across board sizes.")
+    parser.add_argument("--sizes", default="9,100,1000,10000", help="comma-separated numbers of parking spots")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--puck-ratio", type=float, default=0.75, help="pucks per parking spot")
+    parser.add_argument("--output", help="write the results to this JSON file (default: standard output)")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag regressions against a stored JSON result")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown before flagging")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark([int(size) for size in args.sizes.split(",")], args.repeats, args.seed,
+                            args.puck_ratio)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline), args.threshold)
+
+        for regression in regressions:
+            print("REGRESSION {phase} at {spots} spots / {pucks} pucks: p50 {p50_ns} ns vs {baseline_p50_ns} ns "
+                  "({ratio:.2f}x)".format(**regression), file=sys.stderr)
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,34 @@
+import copy
+import unittest
+
+from benchmark import *
+
+
+class BenchmarkTestCase(unittest.TestCase):
+
+    def test_one(self):
+        """Test that every phase is reported for every board size, with 9 spots giving the default 3x3 board."""
+        results = run_benchmark([9, 42], repeats=3, seed=1)
+        self.assertEqual([9, 42], [size["spots"] for size in results["sizes"]])
+        self.assertEqual(6, results["sizes"][0]["pucks"])
+        for size in results["sizes"]:
+            self.assertEqual(set(PHASES), set(size["phases"]))
+            for measured in size["phases"].values():
+                self.assertTrue(measured["ops_per_second"] > 0)
+                self.assertTrue(0 < measured["p50_ns"] <= measured["p99_ns"])
+                self.assertTrue(measured["peak_bytes"] >= 0)
+
+    def test_two(self):
+        """Test that compare only flags phases that slowed down by more than the threshold."""
+        baseline = run_benchmark([9], repeats=1)
+        current = copy.deepcopy(baseline)
+        current["sizes"][0]["phases"]["fill_gaps"]["p50_ns"] = baseline["sizes"][0]["phases"]["fill_gaps"]["p50_ns"] * 2
+        current["sizes"][0]["phases"]["check_gaps"]["p50_ns"] = 1
+
+        regressions = compare(current, baseline, threshold=0.5)
+        self.assertEqual(["fill_gaps"], [regression["phase"] for regression in regressions])
+        self.assertEqual([], compare(baseline, baseline))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+# Author: Ali Alameedi
+
+# Description: Board layout generation for the puck-pathway exercise. A layout describes a serpentine path of parking
+#              spots laid out on a grid of R rows by C columns: the path starts at the tail (origin), runs along the
+#              first row, turns up into the next row and runs back the other way, and so on until it reaches the head
+#              spot where work is performed. The default layout is the 3x3 path on a 480mm x 480mm board from the
+#              problem statement, and larger layouts can be generated to exercise PuckLibrary at realistic scale.
+
+import random
+
+
+class BoardLayout:
+    """
+    This class is a description of a serpentine path of parking spots on a board. It generates the parking spot
+    coordinates in path order (start of the list is the tail of the path, end of the list is the head), the size of
+    the board around them, and random puck positions on that board.
+
+    rows - int
+    columns - int
+    pitch - int (distance between neighbouring parking spots, in mm)
+    origin - (int, int) (coordinates of the tail parking spot)
+    board_size - (int, int) (width and height of the board; by default the spots plus half a pitch of margin)
+    """
+
+    def __init__(self, rows, columns, pitch=120, origin=(180, 60), board_size=None):
+        if rows < 1 or columns < 1:
+            raise ValueError("A board layout needs at least one row and one column.")
+
+        if pitch < 1:
+            raise ValueError("The pitch between parking spots must be positive.")
+
+        origin = tuple(origin)
+        board_size = None if board_size is None else tuple(board_size)
+        if len(origin) != 2 or (board_size is not None and len(board_size) != 2):
+            raise ValueError("The origin and board size of a layout must be (x, y) pairs.")
+
+        if origin[0] < 0 or origin[1] < 0:
+            raise ValueError("The tail parking spot must lie on the board.")
+
+        self.rows = rows
+        self.columns = columns
+        self.pitch = pitch
+        self.origin = (origin[0], origin[1])
+
+        if board_size is None:
+            board_size = (self.origin[0] + (columns - 1) * pitch + pitch // 2,
+                          self.origin[1] + (rows - 1) * pitch + pitch // 2)
+
+        self.board_size = (board_size[0], board_size[1])
+
+    @classmethod
+    def from_head(cls, rows, columns, pitch=120, head=(420, 300), board_size=None):
+        """
+        This method builds a layout from the position of its head parking spot (where work is performed) instead of
+        its tail, by working out which origin puts the end of the serpentine path at that position.
+        """
+        x_offset = 0 if rows % 2 == 0 else (columns - 1) * pitch
+        return cls(rows, columns, pitch, (head[0] - x_offset, head[1] - (rows - 1) * pitch), board_size)
+
+    def __len__(self):
+        return self.rows * self.columns
+
+    def __eq__(self, other):
+        if not isinstance(other, BoardLayout):
+            return NotImplemented
+
+        return self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return "BoardLayout(rows={}, columns={}, pitch={}, origin={}, board_size={})".format(
+            self.rows, self.columns, self.pitch, self.origin, self.board_size)
+
+    def key(self):
+        """Return a tuple that identifies this layout (two layouts with the same key have the same path)."""
+        return self.rows, self.columns, self.pitch, self.origin, self.board_size
+
+    def get_head(self):
+        return self.parking_spot_coordinate(len(self) - 1)
+
+    def get_width(self):
+        return self.board_size[0]
+
+    def get_height(self):
+        return self.board_size[1]
+
+    def parking_spot_coordinate(self, position):
+        """
+        This method returns the (x, y) coordinates of the parking spot at a position along the path (0 is the tail).
+
+        Time Complexity: O(1)
+        """
+        row, column = divmod(position, self.columns)
+        if row % 2:
+            column = self.columns - 1 - column
+
+        return self.origin[0] + column * self.pitch, self.origin[1] + row * self.pitch
+
+    def parking_spot_coordinates(self):
+        """
+        This method generates the (x, y) coordinates of every parking spot in path order, tail first.
+
+        Time Complexity: O(R * C), Space Complexity: O(1) (generator)
+        """
+        x0, y0, pitch, columns = self.origin[0], self.origin[1], self.pitch, self.columns
+        for row in range(self.rows):
+            y = y0 + row * pitch
+            column_order = range(columns) if row % 2 == 0 else range(columns - 1, -1, -1)
+            for column in column_order:
+                yield x0 + column * pitch, y
+
+    def generate_pucks(self, count=None, rng=None):
+        """
+        This method generates random (x, y) coordinates for pucks anywhere on the board. When no count is given, a
+        random number of pucks between 1 and the number of parking spots (inclusive) is generated.
+
+        Time Complexity: O(N), Space Complexity: O(1) (generator)
+        """
+        rng = random if rng is None else rng
+        if count is None:
+            count = rng.randint(1, len(self))
+
+        width, height = self.get_width(), self.get_height()
+        for _ in range(count):
+            yield rng.randint(0, width), rng.randint(0, height)
+
+
+# the 3x3 path on a 480mm x 480mm board, with the head at (420, 300)
+DEFAULT_LAYOUT = BoardLayout(3, 3, 120, (180, 60), (480, 480))
+
+
+def grid_layout(rows, columns, pitch):
+    """
+    This function returns the layout the command line tools use for a number of rows, columns and a pitch: the
+    default layout for its own grid, otherwise a grid whose tail spot is half a pitch in from the corner of the board.
+    """
+    if (rows, columns, pitch) == (DEFAULT_LAYOUT.rows, DEFAULT_LAYOUT.columns, DEFAULT_LAYOUT.pitch):
+        return DEFAULT_LAYOUT
+
+    return BoardLayout(rows, columns, pitch, (pitch // 2, pitch // 2))
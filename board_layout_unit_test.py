@@ -0,0 +1,58 @@
+import random
+import unittest
+from board_layout import *
+from ali_solution import PuckLibrary
+
+
+class BoardLayoutTestCase(unittest.TestCase):
+
+    def test_one(self):
+        """Test that the default layout is the 3x3 serpentine path of the problem statement."""
+        self.assertEqual([(180, 60), (300, 60), (420, 60), (420, 180), (300, 180), (180, 180),
+                          (180, 300), (300, 300), (420, 300)], list(DEFAULT_LAYOUT.parking_spot_coordinates()))
+        self.assertEqual((480, 480), (DEFAULT_LAYOUT.get_width(), DEFAULT_LAYOUT.get_height()))
+
+    def test_two(self):
+        """Test that a layout built from its head position ends at that head, with neighbouring spots one pitch
+        apart."""
+        for rows, columns in [(1, 1), (1, 7), (4, 3), (5, 6)]:
+            layout = BoardLayout.from_head(rows, columns, pitch=50, head=(2000, 1000))
+            coordinates = list(layout.parking_spot_coordinates())
+            self.assertEqual(rows * columns, len(coordinates))
+            self.assertEqual((2000, 1000), coordinates[-1])
+            self.assertEqual(layout.get_head(), coordinates[-1])
+            for position, (first, second) in enumerate(zip(coordinates, coordinates[1:])):
+                self.assertEqual(50, abs(first[0] - second[0]) + abs(first[1] - second[1]))
+                self.assertEqual(second, layout.parking_spot_coordinate(position + 1))
+
+    def test_three(self):
+        """Test that generated pucks stay on the board and are reproducible from a seed."""
+        layout = BoardLayout(10, 12, pitch=30, origin=(15, 15))
+        pucks = list(layout.generate_pucks(500, random.Random(3)))
+        self.assertEqual(pucks, list(layout.generate_pucks(500, random.Random(3))))
+        for x, y in pucks:
+            self.assertTrue(0 <= x <= layout.get_width() and 0 <= y <= layout.get_height())
+
+    def test_four(self):
+        """Test that a full cycle runs unchanged on a generated board: every puck worked and no gaps left."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots(BoardLayout(20, 25, pitch=40, origin=(20, 20)))
+        puck_library.populate_pucks(300, random.Random(4))
+        puck_library.assign_all()
+        puck_library.fill_gaps()
+        self.assertFalse(puck_library.check_gaps())
+
+        puck_library.move_and_perform_work()
+        self.assertTrue(all(puck.get_work_complete_status() for puck in puck_library.pucks))
+
+    def test_five(self):
+        """Test that the command line grid layout is the default layout for the default grid, and otherwise starts
+        half a pitch in from the corner of the board."""
+        self.assertIs(DEFAULT_LAYOUT, grid_layout(3, 3, 120))
+        layout = grid_layout(4, 5, 60)
+        self.assertEqual(BoardLayout(4, 5, 60, (30, 30)), layout)
+        self.assertEqual(((30, 30), (300, 240)), (layout.origin, layout.board_size))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+# Author: Ali Alameedi
+
+# Description: Structured event stream for PuckLibrary. Instead of printing as it goes, the library emits events
+#              (a kind plus a few fields of plain data) to a sink. The NullSink drops them and is the default for
+#              library use, the ConsoleSink renders them as the original program output, and the JsonlSink records
+#              them to a JSON Lines file in batches. A recorded trace can be rendered again later with replay, or from
+#              the command line: python events.py trace.jsonl
+
+import argparse
+import json
+import sys
+
+
+class NullSink:
+    """
+    This class is the event sink that drops every event. Emitters check the 'enabled' flag first, so no event data is
+    built at all while this sink is in use.
+
+    enabled - boolean
+    """
+
+    enabled = False
+
+    def emit(self, kind, **fields):
+        return
+
+    def flush(self):
+        return
+
+    def close(self):
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ConsoleSink(NullSink):
+    """
+    This class is the event sink that renders every event as human-readable text, in the format the program has
+    always printed, to a text stream (default: standard output).
+
+    stream - text file
+    """
+
+    enabled = True
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def emit(self, kind, **fields):
+        render(kind, fields, sys.stdout if self.stream is None else self.stream)
+
+
+class JsonlSink(NullSink):
+    """
+    This class is the event sink that records every event as one JSON object per line ({"event": kind, ...fields}).
+    Lines are buffered and written to the file in batches of batch_size events, and on flush or close.
+
+    path - str
+    batch_size - int
+    """
+
+    enabled = True
+
+    def __init__(self, path, batch_size=1024):
+        self.file = open(path, "w")
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def emit(self, kind, **fields):
+        fields["event"] = kind
+        self.buffer.append(json.dumps(fields, separators=(",", ":")))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write("\n".join(self.buffer))
+            self.file.write("\n")
+            self.buffer.clear()
+
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def _coordinates(points):
+    return [tuple(point) for point in points]
+
+
+def render(kind, fields, stream):
+    """
+    This function writes the human-readable text of one event to a text stream. Coordinates are shown as (x, y)
+    tuples whether the event came straight from the library or was read back from a JSON Lines trace.
+    """
+    if kind == "pucks_populated":
+        print("List of populated original pucks:", _coordinates(fields["pucks"]), file=stream)
+        print("# of pucks:", len(fields["pucks"]), "\n", file=stream)
+
+    elif kind == "parking_spots_populated":
+        print("List of parking spots:", _coordinates(fields["parking_spots"]), file=stream)
+        print("# of parking spots:", len(fields["parking_spots"]), "\n", file=stream)
+
+    elif kind == "puck_assigned":
+        print("Original Location:", tuple(fields["original"]), "Nearest Spot:", tuple(fields["parking_spot"]),
+              file=stream)
+        print("New Location:", tuple(fields["location"]), file=stream)
+
+    elif kind == "work_done":
+        print("Work is being processed on this puck!", file=stream)
+
+    elif kind == "gaps_filled":
+        occupied_before, occupied_after = fields["occupied_before"], fields["occupied_after"]
+        print("Status of all occupied spots:", occupied_before, "\n", file=stream)
+        print("Frequency of occupied spots:", occupied_before.count(True), "\n", file=stream)
+        print("New potential adjustments array: ", [False] * len(occupied_before), "\n", file=stream)
+        print("Removing gaps between pucks & end of path:", occupied_after, "\n", file=stream)
+
+        print("New list of occupied states of parking spots:", file=stream)
+        for occupied in occupied_after:
+            print(occupied, file=stream)
+
+        print(file=stream)
+        for point in _coordinates(fields["occupied_spots"]):
+            print("Occupied Parking Spot Coordinates:", point, file=stream)
+
+        print(file=stream)
+        for point in _coordinates(fields["pucks"]):
+            print("Pucks Coordinates:", point, file=stream)
+
+        print(file=stream)
+
+    elif kind == "final_order":
+        print(file=stream)
+        for x_coordinate, y_coordinate, work_complete in fields["pucks"]:
+            print("Final Order of Pucks", (x_coordinate, y_coordinate), "||", "Work Complete Status:",
+                  work_complete, file=stream)
+
+    else:
+        raise ValueError("Unknown event kind: {!r}".format(kind))
+
+
+def read_trace(path):
+    """This function lazily reads (kind, fields) pairs back from a JSON Lines trace."""
+    with open(path) as trace:
+        for line in trace:
+            if line.strip():
+                fields = json.loads(line)
+                yield fields.pop("event"), fields
+
+
+def replay(path, stream=None):
+    """This function renders a recorded JSON Lines trace as human-readable text (default: to standard output)."""
+    sink = ConsoleSink(stream)
+    for kind, fields in read_trace(path):
+        sink.emit(kind, **fields)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a recorded PuckLibrary event trace as text.")
+    parser.add_argument("trace", help="JSON Lines trace written by JsonlSink")
+    args = parser.parse_args(argv)
+    replay(args.trace)
+
+
+if __name__ == '__main__':
+    main()
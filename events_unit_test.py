@@ -0,0 +1,64 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from ali_solution import PuckLibrary
+from events import *
+
+
+def run_board(events, seed):
+    puck_library = PuckLibrary(events)
+    puck_library.populate_parking_spots()
+    puck_library.populate_pucks(rng=random.Random(seed))
+    for puck in puck_library.pucks:
+        puck_library.calculate_closest_parking_spot(puck)
+    puck_library.fill_gaps()
+    puck_library.move_and_perform_work()
+    return puck_library
+
+
+class EventsTestCase(unittest.TestCase):
+
+    def test_one(self):
+        """Test that the library prints nothing by default."""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            run_board(None, 1)
+
+        self.assertEqual("", stdout.getvalue())
+
+    def test_two(self):
+        """Test that the console sink renders the original program output."""
+        stream = io.StringIO()
+        puck_library = run_board(ConsoleSink(stream), 2)
+        output = stream.getvalue()
+
+        self.assertIn("# of parking spots: 9 \n\n", output)
+        self.assertIn("List of parking spots: [(180, 60), (300, 60), (420, 60), (420, 180)", output)
+        self.assertEqual(len(puck_library.pucks), output.count("Work is being processed on this puck!"))
+        self.assertEqual(len(puck_library.pucks), output.count("New Location:"))
+        self.assertTrue(output.endswith("Work Complete Status: True\n"))
+
+    def test_three(self):
+        """Test that replaying a recorded trace gives exactly the text the console sink renders, for boards with and
+        without gaps, even when the trace is written over several batches."""
+        for seed in range(10):
+            stream = io.StringIO()
+            run_board(ConsoleSink(stream), seed)
+
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "trace.jsonl")
+                with JsonlSink(path, batch_size=3) as sink:
+                    run_board(sink, seed)
+
+                replayed = io.StringIO()
+                replay(path, replayed)
+
+            self.assertEqual(stream.getvalue(), replayed.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
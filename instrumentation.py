@@ -0,0 +1,206 @@
+# Author: Ali Alameedi
+
+# Description: Opt-in instrumentation for PuckLibrary. An Instrumentation records the wall time spent in each phase
+#              (assignment, gap checks and filling, the work cycle, ...) and counts the hot-path operations behind them:
+#              distance evaluations, parking spots scanned, occupancy toggles, puck moves, queue rotations and work
+#              calls. It attaches to one PuckLibrary instance by shadowing that instance's methods with wrappers, so a
+#              library without instrumentation runs exactly the same code as before, with no flag checks inside its
+#              loops. Use it through PuckLibrary.instrument():
+#
+#                  with puck_library.instrument() as instrumentation:
+#                      puck_library.assign_all()
+#                  print(instrumentation.snapshot())
+
+import functools
+import inspect
+import time
+
+# methods whose wall time is recorded as a phase
+PHASES = ("populate_pucks", "populate_parking_spots", "calculate_closest_parking_spot", "assign_all", "check_gaps",
+          "fill_gaps", "move_and_perform_work", "move_and_perform_work_async",
+          "move_and_perform_work_parallel")
+
+COUNTERS = ("distance_evaluations", "spots_scanned", "occupancy_toggles", "puck_moves", "rotations", "work_calls")
+
+
+class _CountingBucket(set):
+    """A grid cell of a FreeSpotIndex that counts the parking spots read from it while instrumentation is attached."""
+
+    __slots__ = ("counters",)
+
+    def __iter__(self):
+        self.counters["spots_scanned"] += len(self)
+        self.counters["distance_evaluations"] += len(self)
+        return super().__iter__()
+
+
+class Instrumentation:
+    """
+    This class holds per-phase wall time and hot-path counters for a PuckLibrary, and the wrappers that collect them.
+
+    phase_seconds - dict<str, float>
+    phase_calls - dict<str, int>
+    counters - dict<str, int>
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+        self.phase_calls = dict.fromkeys(PHASES, 0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.wrapped = []
+
+    def reset(self):
+        for phase in PHASES:
+            self.phase_seconds[phase] = 0.0
+            self.phase_calls[phase] = 0
+
+        for counter in COUNTERS:
+            self.counters[counter] = 0
+
+    def snapshot(self):
+        """Return a copy of the current measurements: {"phases": {phase: {"calls", "seconds"}}, "counters": {...}}."""
+        return {"phases": {phase: {"calls": self.phase_calls[phase], "seconds": self.phase_seconds[phase]}
+                           for phase in PHASES},
+                "counters": dict(self.counters)}
+
+    def attach(self, library):
+        """This method wraps the methods of one PuckLibrary instance so they record into this Instrumentation."""
+        counters = self.counters
+
+        def count_before(name, counter, amount=None):
+            # add amount(library) (default: 1) to a counter before calling the wrapped method
+            original = getattr(library, name)
+
+            if inspect.iscoroutinefunction(original):
+                # stay a coroutine function, so _timed times the whole coroutine rather than its creation
+                @functools.wraps(original)
+                async def wrapper(*args, **kwargs):
+                    counters[counter] += 1 if amount is None else amount(library)
+                    return await original(*args, **kwargs)
+            else:
+                @functools.wraps(original)
+                def wrapper(*args, **kwargs):
+                    counters[counter] += 1 if amount is None else amount(library)
+                    return original(*args, **kwargs)
+
+            self._install(library, name, wrapper)
+
+        def puck_count(library):
+            return len(library.pucks)
+
+        def spot_count(library):
+            return len(library.parking_spots)
+
+        def step_count(library):
+            return min(1, len(library.pucks))
+
+        def compacted_puck_count(library):
+            return min(len(library.pucks), library.get_occupancy().bit_count())
+
+        count_before("do_work", "work_calls")
+        count_before("move_puck", "puck_moves")
+        count_before("_record_occupancy", "occupancy_toggles")
+        count_before("rotate", "rotations")
+        count_before("_compact", "puck_moves", compacted_puck_count)
+        count_before("move_and_perform_work", "rotations", puck_count)
+        count_before("move_and_perform_work_async", "rotations", puck_count)
+        count_before("move_and_perform_work_parallel", "rotations", puck_count)
+        count_before("scan_closest_parking_spot", "spots_scanned", spot_count)
+        count_before("scan_closest_parking_spot", "distance_evaluations", spot_count)
+
+        # one step of the work cycle: the queue rotates once and every puck moves one parking spot
+        count_before("advance", "rotations", step_count)
+        count_before("advance", "puck_moves", puck_count)
+
+        # remove_puck moves every puck in front of the removed one forward one parking spot
+        original_remove_puck = library.remove_puck
+
+        @functools.wraps(original_remove_puck)
+        def remove_puck(puck_object):
+            try:
+                moves = library.pucks.index(puck_object)
+            except ValueError:
+                moves = 0
+
+            result = original_remove_puck(puck_object)
+            counters["puck_moves"] += moves
+            return result
+
+        self._install(library, "remove_puck", remove_puck)
+
+        # assign_all evaluates the full puck x spot matrix, plus one row per conflict
+        original_assign_all = library.assign_all
+
+        @functools.wraps(original_assign_all)
+        def assign_all(*args, **kwargs):
+            assigned = original_assign_all(*args, **kwargs)
+            evaluations = (len(assigned) + library.last_assignment_conflicts) * len(library.parking_spots)
+            counters["distance_evaluations"] += evaluations
+            counters["spots_scanned"] += evaluations
+            return assigned
+
+        self._install(library, "assign_all", assign_all)
+
+        # the free spot index counts the spots it reads while its grid cells are counting buckets
+        original_get_free_spot_index = library.get_free_spot_index
+
+        @functools.wraps(original_get_free_spot_index)
+        def get_free_spot_index():
+            index = original_get_free_spot_index()
+            if index.buckets and type(index.buckets[0]) is not _CountingBucket:
+                index.buckets = [self._counting_bucket(bucket) for bucket in index.buckets]
+
+            return index
+
+        self._install(library, "get_free_spot_index", get_free_spot_index)
+
+        # phase timers go around everything else
+        for phase in PHASES:
+            self._install(library, phase, self._timed(phase, getattr(library, phase)))
+
+    def detach(self, library):
+        """This method removes the wrappers installed by attach, restoring the library's own methods."""
+        for name in set(self.wrapped):
+            library.__dict__.pop(name, None)
+
+        self.wrapped = []
+
+        index = library.free_spot_index
+        if index is not None and index.buckets and type(index.buckets[0]) is _CountingBucket:
+            index.buckets = [set(bucket) for bucket in index.buckets]
+
+    def _install(self, library, name, wrapper):
+        setattr(library, name, wrapper)
+        self.wrapped.append(name)
+
+    def _counting_bucket(self, bucket):
+        counting = _CountingBucket(bucket)
+        counting.counters = self.counters
+        return counting
+
+    def _timed(self, phase, original):
+        clock, phase_seconds, phase_calls = self.clock, self.phase_seconds, self.phase_calls
+
+        if inspect.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def timed(*args, **kwargs):
+                start = clock()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    phase_seconds[phase] += clock() - start
+                    phase_calls[phase] += 1
+
+            return timed
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                phase_seconds[phase] += clock() - start
+                phase_calls[phase] += 1
+
+        return timed
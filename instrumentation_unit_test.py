@@ -0,0 +1,107 @@
+import asyncio
+import random
+import unittest
+
+from ali_solution import ParkingSpot, Puck, PuckLibrary
+from instrumentation import *
+
+
+def default_board(seed, count=9):
+    puck_library = PuckLibrary()
+    puck_library.populate_parking_spots()
+    puck_library.populate_pucks(count, random.Random(seed))
+    return puck_library
+
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def test_one(self):
+        """Test the counters of a full cycle on a full 3x3 board."""
+        puck_library = default_board(1)
+        with puck_library.instrument() as instrumentation:
+            puck_library.assign_all()
+            puck_library.fill_gaps()
+            puck_library.move_and_perform_work()
+
+        counters = instrumentation.snapshot()["counters"]
+        self.assertEqual(9, counters["puck_moves"])
+        self.assertEqual(9, counters["occupancy_toggles"])
+        self.assertEqual(9, counters["rotations"])
+        self.assertEqual(9, counters["work_calls"])
+        self.assertEqual((9 + puck_library.last_assignment_conflicts) * 9, counters["distance_evaluations"])
+
+        phases = instrumentation.snapshot()["phases"]
+        self.assertEqual(1, phases["assign_all"]["calls"])
+        self.assertEqual(1, phases["check_gaps"]["calls"])
+        self.assertTrue(phases["move_and_perform_work"]["seconds"] > 0)
+
+    def test_two(self):
+        """Test that the free spot index counts the spots it reads, fewer than a linear scan would on a large
+        board."""
+        puck_library = default_board(2, 0)
+        for x in range(0, 3000, 30):
+            for y in range(0, 3000, 30):
+                puck_library.parking_spots.append(ParkingSpot(x, y))
+
+        puck_library.populate_pucks(50, random.Random(2))
+        with puck_library.instrument() as instrumentation:
+            for puck in puck_library.pucks:
+                puck_library.calculate_closest_parking_spot(puck)
+
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(50, snapshot["phases"]["calculate_closest_parking_spot"]["calls"])
+        self.assertTrue(0 < snapshot["counters"]["spots_scanned"] < 50 * len(puck_library.parking_spots) // 100)
+
+    def test_three(self):
+        """Test that leaving the with block restores the library's own methods and stops counting."""
+        puck_library = default_board(3)
+        with puck_library.instrument() as instrumentation:
+            puck_library.calculate_closest_parking_spot(puck_library.pucks[0])
+            self.assertEqual(instrumentation.snapshot(), puck_library.get_instrumentation_snapshot())
+
+        self.assertIsNone(puck_library.get_instrumentation_snapshot())
+        self.assertFalse(set(PHASES) & set(vars(puck_library)))
+        self.assertIs(set, type(puck_library.free_spot_index.buckets[0]))
+
+        before = instrumentation.snapshot()
+        puck_library.move_and_perform_work()
+        self.assertEqual(before, instrumentation.snapshot())
+
+    def test_four(self):
+        """Test that the incremental updates count their rotations and puck moves like the full work cycle does."""
+        puck_library = default_board(4, 5)
+        puck_library.assign_all()
+        puck_library.fill_gaps()
+        puck_library.advance()
+        with puck_library.instrument() as instrumentation:
+            puck_library.advance()
+            puck_library.add_puck(0, 0)
+            puck_library.remove_puck(puck_library.pucks[4])
+            self.assertRaises(ValueError, puck_library.remove_puck, Puck())
+
+        counters = instrumentation.snapshot()["counters"]
+        self.assertEqual((1, 1), (counters["rotations"], counters["work_calls"]))
+        self.assertEqual(5 + 1 + 4, counters["puck_moves"])
+        self.assertEqual(2, counters["occupancy_toggles"])
+
+    def test_five(self):
+        """Test that the asynchronous work cycle is timed until its coroutine finishes, not just until it is
+        created."""
+        puck_library = default_board(5, 5)
+        puck_library.assign_all()
+        puck_library.fill_gaps()
+
+        async def work(puck):
+            await asyncio.sleep(0.02)
+
+        with puck_library.instrument() as instrumentation:
+            asyncio.run(puck_library.move_and_perform_work_async(work))
+
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(1, snapshot["phases"]["move_and_perform_work_async"]["calls"])
+        self.assertTrue(snapshot["phases"]["move_and_perform_work_async"]["seconds"] >= 5 * 0.02)
+        self.assertEqual((5, 5), (snapshot["counters"]["rotations"], snapshot["counters"]["work_calls"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+# Author: Ali Alameedi
+
+# Description: Monte Carlo engine for the puck-pathway exercise. Each trial runs the same flow as the main program on
+#              a fresh board (populate, assign to closest parking spots, fill gaps) and records how far pucks had to
+#              move to their parking spot, whether gaps had to be filled and the length of the work cycle in queue
+#              steps. The cycle length is trivial: move_and_perform_work works the head puck and rotates the queue
+#              once per puck, which brings it back to its original order, so it is recorded from the puck count
+#              instead of running the cycle. Trials are split into fixed-size shards, each shard seeded from the run
+#              seed and its shard number, so a run gives the same statistics no matter how many worker processes it
+#              is spread over. Workers only send back aggregated statistics, never Puck objects.
+
+import argparse
+import collections
+import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ali_solution import PuckLibrary
+from board_layout import DEFAULT_LAYOUT, grid_layout
+
+
+class RunningStatistics:
+    """
+    This class keeps the count, mean, variance, minimum and maximum of a stream of values in constant space
+    (Welford's algorithm), and can be merged with another instance (Chan et al.) to combine shards.
+
+    count - int
+    mean - float
+    m2 - float (sum of squared differences from the mean)
+    minimum - float
+    maximum - float
+    """
+
+    __slots__ = ("count", "mean", "m2", "minimum", "maximum")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def add_many(self, values):
+        """Add every value of a NumPy array at once."""
+        if len(values) == 0:
+            return
+
+        batch = RunningStatistics()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.minimum = float(values.min())
+        batch.maximum = float(values.max())
+        self.merge(batch)
+
+    def merge(self, other):
+        if not other.count:
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def get_variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def as_dict(self):
+        return {"count": self.count, "mean": self.mean, "stdev": math.sqrt(self.get_variance()),
+                "min": self.minimum if self.count else None, "max": self.maximum if self.count else None}
+
+
+class TrialSummary:
+    """
+    This class holds the aggregated results of a number of trials. It is what worker processes send back, and
+    summaries of different shards are merged into one.
+
+    trials - int
+    gap_trials - int (trials where gaps had to be filled after assignment)
+    displacement - RunningStatistics (distance in mm from each puck's random position to its parking spot)
+    cycle_length - RunningStatistics (queue steps of the work cycle, which is always the number of pucks)
+    cycle_histogram - Counter<int, int> (number of trials per cycle length)
+    """
+
+    def __init__(self):
+        self.trials = 0
+        self.gap_trials = 0
+        self.displacement = RunningStatistics()
+        self.cycle_length = RunningStatistics()
+        self.cycle_histogram = collections.Counter()
+
+    def merge(self, other):
+        self.trials += other.trials
+        self.gap_trials += other.gap_trials
+        self.displacement.merge(other.displacement)
+        self.cycle_length.merge(other.cycle_length)
+        self.cycle_histogram.update(other.cycle_histogram)
+
+    def get_gap_frequency(self):
+        return self.gap_trials / self.trials if self.trials else 0.0
+
+    def as_dict(self):
+        return {"trials": self.trials, "gap_frequency": self.get_gap_frequency(),
+                "displacement": self.displacement.as_dict(), "cycle_length": self.cycle_length.as_dict(),
+                "cycle_histogram": {str(length): count for length, count in sorted(self.cycle_histogram.items())}}
+
+
+def run_trial(layout, rng, summary):
+    """
+    This function runs one trial on a fresh board and adds its results to a TrialSummary.
+
+    Time Complexity: O(N * S) for N pucks on S parking spots (dominated by assignment)
+    """
+    puck_library = PuckLibrary()
+    puck_library.populate_parking_spots(layout)
+    puck_library.populate_pucks(rng=rng)
+
+    store = puck_library.puck_store
+    original_x = np.array(store.x_coordinates, dtype=np.float64)
+    original_y = np.array(store.y_coordinates, dtype=np.float64)
+
+    puck_library.assign_all()
+    summary.displacement.add_many(np.hypot(np.array(store.x_coordinates) - original_x,
+                                           np.array(store.y_coordinates) - original_y))
+
+    summary.trials += 1
+    if puck_library.check_gaps():
+        summary.gap_trials += 1
+        puck_library.fill_gaps()
+
+    # the work cycle takes one queue step per puck (see the description at the top of this module)
+    cycle_length = len(puck_library.pucks)
+    summary.cycle_length.add(cycle_length)
+    summary.cycle_histogram[cycle_length] += 1
+
+
+def run_shard(shard, seed, trials, layout=DEFAULT_LAYOUT):
+    """
+    This function runs the trials of one shard with its own seeded random.Random and returns their TrialSummary.
+    """
+    rng = random.Random("{}/{}".format(seed, shard))
+    summary = TrialSummary()
+    for _ in range(trials):
+        run_trial(layout, rng, summary)
+
+    return summary
+
+
+def _run_shard(arguments):
+    return run_shard(*arguments)
+
+
+def run_trials(trials, seed=0, workers=None, layout=DEFAULT_LAYOUT, shard_size=1000):
+    """
+    This function runs a number of independent trials and returns their merged TrialSummary. Trials are split into
+    shards of shard_size trials that are spread over a process pool of 'workers' processes (default: one per CPU; 1
+    runs everything in this process). Shards are merged in order, so the result only depends on trials, seed,
+    layout and shard_size.
+    """
+    shards = [(shard, seed, min(shard_size, trials - start), layout)
+              for shard, start in enumerate(range(0, trials, shard_size))]
+
+    summary = TrialSummary()
+    if workers == 1 or len(shards) <= 1:
+        results = map(_run_shard, shards)
+        for result in results:
+            summary.merge(result)
+
+        return summary
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(_run_shard, shards):
+            summary.merge(result)
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many seeded puck-pathway trials and report statistics as JSON.")
+    parser.add_argument("--trials", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--shard-size", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=DEFAULT_LAYOUT.rows)
+    parser.add_argument("--columns", type=int, default=DEFAULT_LAYOUT.columns)
+    parser.add_argument("--pitch", type=int, default=DEFAULT_LAYOUT.pitch)
+    args = parser.parse_args(argv)
+
+    layout = grid_layout(args.rows, args.columns, args.pitch)
+    summary = run_trials(args.trials, args.seed, args.workers, layout, args.shard_size)
+    print(json.dumps(summary.as_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
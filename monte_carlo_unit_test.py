@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from board_layout import BoardLayout
+from monte_carlo import *
+
+
+class MonteCarloTestCase(unittest.TestCase):
+
+    def test_one(self):
+        """Test that merged running statistics match statistics computed over all values at once."""
+        values = np.random.default_rng(1).normal(50, 10, 1000)
+        statistics = RunningStatistics()
+        statistics.add_many(values[:300])
+        for value in values[300:400]:
+            statistics.add(value)
+        other = RunningStatistics()
+        other.add_many(values[400:])
+        statistics.merge(other)
+
+        self.assertEqual(1000, statistics.count)
+        self.assertAlmostEqual(values.mean(), statistics.mean)
+        self.assertAlmostEqual(values.var(ddof=1), statistics.get_variance())
+        self.assertEqual((values.min(), values.max()), (statistics.minimum, statistics.maximum))
+
+    def test_two(self):
+        """Test that trials on the default board have 1 - 9 pucks that never move further than the board diagonal."""
+        summary = run_trials(300, seed=2, workers=1, shard_size=100)
+        self.assertEqual(300, summary.trials)
+        self.assertEqual(300, sum(summary.cycle_histogram.values()))
+        self.assertTrue(set(summary.cycle_histogram) <= set(range(1, 10)))
+        self.assertEqual(300, summary.cycle_length.count)
+        self.assertTrue(1 <= summary.cycle_length.minimum <= summary.cycle_length.mean <= summary.cycle_length.maximum)
+        self.assertTrue(0 < summary.gap_trials < 300)
+        self.assertTrue(0 <= summary.displacement.minimum <= summary.displacement.maximum <= 480 * 2 ** 0.5)
+
+    def test_three(self):
+        """Test that a run gives the same statistics in one process and spread over a process pool."""
+        serial = run_trials(200, seed=3, workers=1, shard_size=50)
+        parallel = run_trials(200, seed=3, workers=2, shard_size=50)
+        self.assertEqual(serial.as_dict(), parallel.as_dict())
+        self.assertNotEqual(serial.as_dict(), run_trials(200, seed=4, workers=1, shard_size=50).as_dict())
+
+    def test_four(self):
+        """Test that the cycle length of a trial is its number of pucks (one queue step per puck)."""
+        layout = BoardLayout(2, 3, 100, (50, 50))
+        summary = TrialSummary()
+        for trial in range(20):
+            run_trial(layout, random.Random(trial), summary)
+
+        puck_counts = collections.Counter(len(list(layout.generate_pucks(None, random.Random(trial))))
+                                          for trial in range(20))
+        self.assertEqual(puck_counts, summary.cycle_histogram)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,225 @@
+# Author: Ali Alameedi
+
+# Description: Precomputed nearest-parking-spot lookup table. The parking spot layout never changes during the life of
+#              a PuckLibrary, so the closest spots to every point of the board can be worked out once. The board is
+#              divided into square raster cells (one per integer coordinate by default on small boards), and every cell
+#              stores a ranked list of its K closest parking spots plus a radius: no parking spot outside the list is
+#              closer to the cell than that radius. Finding the closest free spot is then an array lookup and a short
+#              walk down the list; only when no listed spot is free and provably closer than every unlisted one do we
+#              fall back to a full search. Tables are cached per layout in memory and, optionally, on disk as .npy
+#              files that are memory-mapped when loaded.
+
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+
+# tables are built in blocks of cells so that at most this many cell/spot distances are in memory at once
+_BUILD_BLOCK_SIZE = 1 << 22
+
+# upper bound on (raster cells x parking spots) when the cell size is picked automatically
+_BUILD_BUDGET = 50_000_000
+
+# upper bound on raster cells when the cell size is picked automatically
+_MAX_CELLS = 1 << 20
+
+_FORMAT_VERSION = 1
+
+_tables = {}  # in-memory cache: key -> NearestSpotTable
+
+
+class NearestSpotTable:
+    """
+    This class is a raster over the board where each cell holds its closest parking spots, closest first, so that
+    nearest-spot queries do not have to look at every parking spot.
+
+    Cell (column, row) covers the board coordinates [column * cell_size, (column + 1) * cell_size) by
+    [row * cell_size, (row + 1) * cell_size), and distances are measured from its anchor point, the middle of the
+    integer coordinates it covers. With cell_size 1 the anchor is the coordinate itself.
+
+    candidates - ndarray<int32>[cells, K] (parking spot positions along the path)
+    radius - ndarray<float64>[cells] (every parking spot not in the list is at least this far from the anchor)
+    cell_size - int
+    columns - int
+    rows - int
+    key - str
+    """
+
+    def __init__(self, candidates, radius, cell_size, columns, rows, key):
+        self.candidates = candidates
+        self.radius = radius
+        self.cell_size = cell_size
+        self.columns = columns
+        self.rows = rows
+        self.key = key
+
+    @classmethod
+    def build(cls, spot_x, spot_y, width, height, cell_size=None, candidate_count=8, key=None):
+        """
+        This method builds the table for parking spots at (spot_x, spot_y) on a width x height board.
+
+        Time Complexity: O(C * S) for C raster cells and S parking spots (vectorized, in blocks of cells).
+        """
+        spot_x = np.asarray(spot_x, dtype=np.int64)
+        spot_y = np.asarray(spot_y, dtype=np.int64)
+        spot_count = len(spot_x)
+        if cell_size is None:
+            cell_size = default_cell_size(spot_count, width, height)
+
+        columns = width // cell_size + 1
+        rows = height // cell_size + 1
+        cell_count = columns * rows
+        listed = min(candidate_count, spot_count)
+
+        candidates = np.empty((cell_count, listed), dtype=np.int32)
+        radius = np.full(cell_count, np.inf)
+        spot_order = np.arange(spot_count)
+        block = max(1, _BUILD_BLOCK_SIZE // max(1, spot_count))
+
+        # anchors are doubled so that they stay integers: 2 * anchor = 2 * start + cell_size - 1
+        for start in range(0, cell_count, block):
+            cells = np.arange(start, min(start + block, cell_count))
+            anchor_x = 2 * (cells // rows) * cell_size + cell_size - 1
+            anchor_y = 2 * (cells % rows) * cell_size + cell_size - 1
+            distances = (np.subtract.outer(anchor_x, 2 * spot_x) ** 2 +
+                         np.subtract.outer(anchor_y, 2 * spot_y) ** 2)
+
+            # closest spots first, ties broken by position along the path
+            if listed < spot_count:
+                nearest = np.argpartition(distances, listed, axis=1)[:, :listed + 1]
+            else:
+                nearest = np.broadcast_to(spot_order, distances.shape)
+
+            nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+            ranked = np.lexsort((nearest, nearest_distances), axis=1)
+            nearest = np.take_along_axis(nearest, ranked, axis=1)
+            candidates[cells] = nearest[:, :listed]
+
+            if listed < spot_count:
+                # the first unlisted spot bounds everything unlisted (argpartition put every spot at least as far
+                # as the listed ones at or past index 'listed')
+                unlisted = np.take_along_axis(distances, nearest[:, listed:listed + 1], axis=1)[:, 0]
+                radius[cells] = np.sqrt(unlisted) / 2
+
+        return cls(candidates, radius, cell_size, columns, rows, key)
+
+    def lookup(self, x_coordinate, y_coordinate, spot_x, spot_y, occupied):
+        """
+        This method returns the position along the path of the closest parking spot to (x_coordinate, y_coordinate)
+        whose occupied flag is 0, with ties going to the earliest spot in the path. It returns None when the table
+        cannot prove an answer (no listed spot is free and closer than every unlisted spot, or the point is off the
+        board); the caller then has to search all parking spots.
+
+        Time Complexity: O(K) for K listed spots per cell.
+        """
+        cell_size = self.cell_size
+        column = int(x_coordinate // cell_size)
+        row = int(y_coordinate // cell_size)
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return None
+
+        cell = column * self.rows + row
+        best_distance = None
+        best_idx = None
+        for idx in self.candidates[cell].tolist():
+            if occupied[idx]:
+                continue
+
+            dx = spot_x[idx] - x_coordinate
+            dy = spot_y[idx] - y_coordinate
+            distance = dx * dx + dy * dy
+            if best_distance is None or distance < best_distance or (distance == best_distance and idx < best_idx):
+                best_distance = distance
+                best_idx = idx
+
+        if best_idx is None:
+            return None
+
+        # unlisted spots are at least radius - (distance from the point to the anchor) away
+        offset = math.hypot(x_coordinate - column * cell_size - (cell_size - 1) / 2,
+                            y_coordinate - row * cell_size - (cell_size - 1) / 2)
+        if math.sqrt(best_distance) + offset >= self.radius[cell] * (1 - 1e-12):
+            return None
+
+        return best_idx
+
+    def save(self, directory):
+        """This method writes the table to a directory as .npy arrays plus a small JSON header."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "candidates.npy"), self.candidates)
+        np.save(os.path.join(directory, "radius.npy"), self.radius)
+        with open(os.path.join(directory, "table.json"), "w") as header:
+            json.dump({"version": _FORMAT_VERSION, "cell_size": self.cell_size, "columns": self.columns,
+                       "rows": self.rows, "key": self.key}, header)
+
+    @classmethod
+    def load(cls, directory):
+        """This method memory-maps a table written by save. It returns None if there is no usable table there."""
+        try:
+            with open(os.path.join(directory, "table.json")) as header:
+                meta = json.load(header)
+
+            if meta["version"] != _FORMAT_VERSION:
+                return None
+
+            candidates = np.load(os.path.join(directory, "candidates.npy"), mmap_mode="r")
+            radius = np.load(os.path.join(directory, "radius.npy"), mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+
+        return cls(candidates, radius, meta["cell_size"], meta["columns"], meta["rows"], meta["key"])
+
+
+def default_cell_size(spot_count, width, height):
+    """Return the smallest cell size whose raster stays within the build budget (1 for the default board)."""
+    max_cells = max(1, min(_MAX_CELLS, _BUILD_BUDGET // max(1, spot_count)))
+    cell_size = max(1, math.ceil(math.sqrt((width + 1) * (height + 1) / max_cells)))
+    while (width // cell_size + 1) * (height // cell_size + 1) > max_cells:
+        cell_size += 1
+
+    return cell_size
+
+
+def layout_key(spot_x, spot_y, width, height, cell_size, candidate_count):
+    """Return a string that identifies a table: the parking spot coordinates, board size and table parameters."""
+    digest = hashlib.sha256()
+    digest.update(np.asarray(spot_x, dtype=np.int64).tobytes())
+    digest.update(np.asarray(spot_y, dtype=np.int64).tobytes())
+    digest.update(repr((width, height, cell_size, candidate_count, _FORMAT_VERSION)).encode())
+    return digest.hexdigest()
+
+
+def get_table(spot_x, spot_y, width, height, cell_size=None, candidate_count=8, cache_dir=None):
+    """
+    This function returns the table for a layout, building it only if it is neither in the in-memory cache nor (when
+    cache_dir is given) on disk. The table returned is in both caches afterwards.
+    """
+    if cell_size is None:
+        cell_size = default_cell_size(len(spot_x), width, height)
+
+    key = layout_key(spot_x, spot_y, width, height, cell_size, candidate_count)
+    directory = None if cache_dir is None else os.path.join(cache_dir, key)
+    table = _tables.get(key)
+    if table is not None:
+        if directory is not None and not os.path.exists(os.path.join(directory, "table.json")):
+            table.save(directory)
+
+        return table
+
+    if directory is not None:
+        table = NearestSpotTable.load(directory)
+
+    if table is None or table.key != key:
+        table = NearestSpotTable.build(spot_x, spot_y, width, height, cell_size, candidate_count, key)
+        if directory is not None:
+            table.save(directory)
+
+    _tables[key] = table
+    return table
+
+
+def clear_cache():
+    """This function empties the in-memory table cache."""
+    _tables.clear()
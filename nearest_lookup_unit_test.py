@@ -0,0 +1,83 @@
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from ali_solution import Puck, PuckLibrary
+from board_layout import BoardLayout
+from nearest_lookup import *
+
+
+def random_board(layout, seed, cell_size=None, candidate_count=8, cache_dir=None):
+    puck_library = PuckLibrary()
+    puck_library.populate_parking_spots(layout)
+    puck_library.use_nearest_spot_table(cell_size, candidate_count, cache_dir)
+    puck_library.populate_pucks(len(layout), random.Random(seed))
+    return puck_library
+
+
+class NearestLookupTestCase(unittest.TestCase):
+
+    def setUp(self):
+        clear_cache()
+
+    def test_one(self):
+        """Test that table lookups give the same parking spot as a linear scan while the board fills up, on the
+        default board (one cell per coordinate) and on larger boards with coarser cells."""
+        for layout, cell_size, candidate_count in [(BoardLayout(3, 3, 120, (180, 60), (480, 480)), None, 8),
+                                                   (BoardLayout(8, 9, 50, (25, 25)), 7, 4),
+                                                   (BoardLayout(12, 12, 30, (15, 15)), 40, 6)]:
+            puck_library = random_board(layout, 1, cell_size, candidate_count)
+            for puck in puck_library.pucks:
+                expected = puck_library.scan_closest_parking_spot(puck)
+                self.assertIs(expected, puck_library.find_closest_parking_spot(puck))
+                puck_library.move_puck(puck, expected)
+
+    def test_two(self):
+        """Test that the default board gets an exact one-cell-per-coordinate raster answering most queries."""
+        puck_library = random_board(BoardLayout(3, 3, 120, (180, 60), (480, 480)), 2)
+        table = puck_library.get_nearest_spot_table()
+        self.assertEqual((1, 481, 481), (table.cell_size, table.columns, table.rows))
+
+        store = puck_library.spot_store
+        free = bytearray(9)
+        answered = sum(table.lookup(x, y, store.x_coordinates, store.y_coordinates, free) is not None
+                       for x in range(0, 481, 7) for y in range(0, 481, 7))
+        self.assertEqual(69 * 69, answered)
+
+    def test_three(self):
+        """Test that tables are cached per layout in memory, rebuilt when the parking spots change, and memory-mapped
+        back from disk."""
+        layout = BoardLayout(5, 5, 40, (20, 20))
+        first = random_board(layout, 3)
+        second = random_board(layout, 4)
+        self.assertIs(first.get_nearest_spot_table(), second.get_nearest_spot_table())
+
+        second.populate_parking_spots(BoardLayout(1, 1, 40, (500, 500)))
+        self.assertIsNot(first.get_nearest_spot_table(), second.get_nearest_spot_table())
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            built = random_board(layout, 5, cache_dir=cache_dir).get_nearest_spot_table()
+            clear_cache()
+            loaded = random_board(layout, 5, cache_dir=cache_dir).get_nearest_spot_table()
+            self.assertIsNot(built, loaded)
+            self.assertIsInstance(loaded.candidates, np.memmap)
+            self.assertTrue(np.array_equal(built.candidates, loaded.candidates))
+            self.assertTrue(np.array_equal(built.radius, loaded.radius))
+
+    def test_four(self):
+        """Test that queries off the board or next to occupied cells fall back instead of guessing."""
+        puck_library = random_board(BoardLayout(3, 3, 120, (180, 60), (480, 480)), 6, candidate_count=2)
+        for parking_spot in puck_library.parking_spots[-2:]:
+            puck_library.move_puck(Puck(), parking_spot)
+
+        puck = Puck()
+        for x, y in [(420, 300), (-5, 3), (1000, 20)]:
+            puck.set_x_coordinate(x)
+            puck.set_y_coordinate(y)
+            self.assertIs(puck_library.scan_closest_parking_spot(puck), puck_library.find_closest_parking_spot(puck))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,370 @@
+# Author: Ali Alameedi
+
+# Description: Local request service in front of PuckLibrary. A long-lived asyncio server (TCP or Unix socket) reads
+#              board requests as JSON Lines, one board per line, and streams one JSON result line back per request in
+#              the order they were sent. Requests are served by warm PuckLibrary instances kept in a pool per board
+#              layout, so parking spots are only generated once per layout. Requests arriving together (from any
+#              connection) are collected for up to a couple of milliseconds and assigned as one micro-batch: the
+#              nearest spot of every puck of every board of a layout is found in a single vectorized computation (see
+#              PuckLibrary.assign_batch). A load generator is included to measure latency and throughput locally.
+#
+# Request:  {"id": 1, "pucks": [[x, y], ...], "layout": {"rows": 3, "columns": 3, ...}, "fill_gaps": true}
+#           (layout and fill_gaps are optional; layout takes the BoardLayout arguments, DEFAULT_LAYOUT otherwise)
+# Response: {"id": 1, "spots": [[x, y], ...], "gaps": true, "pucks": [[x, y], ...], "batch": 12}
+#           (spots: parking spot each puck was assigned to, gaps: whether there were gaps before filling them,
+#           pucks: final puck positions in queue order, batch: number of requests served together)
+#           or {"id": 1, "error": "..."} if the request could not be served.
+#
+# Usage: python service.py serve --port 8765              (or --unix /tmp/pucks.sock)
+#        python service.py load --port 8765 --requests 10000 --connections 16
+
+import argparse
+import asyncio
+import collections
+import json
+import random
+import sys
+import time
+
+from ali_solution import PuckLibrary, check_coordinate
+from benchmark import percentile
+from board_layout import DEFAULT_LAYOUT, BoardLayout
+
+
+def parse_layout(fields):
+    """Return the BoardLayout described by the layout field of a request (DEFAULT_LAYOUT when there is none). Raises
+    TypeError or ValueError if it does not describe a valid layout of whole numbers, and OverflowError if its parking
+    spots lie outside the supported coordinate range (see ali_solution.check_coordinate)."""
+    if fields is None:
+        return DEFAULT_LAYOUT
+
+    if not isinstance(fields, dict):
+        raise ValueError("layout must be an object of BoardLayout arguments")
+
+    layout = BoardLayout(**fields)
+    if not all(type(value) is int for value in (layout.rows, layout.columns, layout.pitch) + layout.origin +
+               layout.board_size):
+        raise ValueError("layout fields must be whole numbers")
+
+    # the parking spots lie between the origin and the point (columns - 1, rows - 1) pitches away from it
+    for coordinate in layout.origin + (layout.origin[0] + (layout.columns - 1) * layout.pitch,
+                                       layout.origin[1] + (layout.rows - 1) * layout.pitch):
+        check_coordinate(coordinate)
+
+    return DEFAULT_LAYOUT if layout == DEFAULT_LAYOUT else layout
+
+
+class LibraryPool:
+    """
+    This class keeps warm PuckLibrary instances per board layout. A library taken from the pool already has the
+    parking spots of its layout; when it is given back its pucks are cleared and it is kept for the next request, up
+    to 'size' idle libraries per layout. Idle libraries are kept for at most 'max_layouts' layouts: giving back a
+    library of another layout drops those of the least recently used one.
+
+    size - int (idle libraries kept per layout)
+    max_layouts - int (layouts idle libraries are kept for)
+    idle - OrderedDict<BoardLayout, [PuckLibrary, ...]> (least recently used layout first)
+    created - int (libraries built so far, for monitoring)
+    """
+
+    def __init__(self, size=8, layouts=(DEFAULT_LAYOUT,), max_layouts=16):
+        self.size = size
+        self.max_layouts = max_layouts
+        self.idle = collections.OrderedDict()
+        self.created = 0
+
+        # preallocate the layouts we expect, so the first requests are served warm
+        for layout in layouts[:max_layouts]:
+            self.idle[layout] = [self._build(layout) for _ in range(size)]
+
+    def _build(self, layout):
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots(layout)
+        puck_library.get_occupancy()  # build the spot positions and occupancy bitmap now rather than on first use
+        self.created += 1
+        return puck_library
+
+    def acquire(self, layout):
+        """Return an empty library with the parking spots of a layout."""
+        idle = self.idle.get(layout)
+        if not idle:
+            return self._build(layout)
+
+        self.idle.move_to_end(layout)
+        return idle.pop()
+
+    def release(self, puck_library):
+        """Clear a library's pucks and keep it for another request of its layout (if the pool is not full)."""
+        puck_library.clear_pucks()
+        layout = puck_library.layout
+        idle = self.idle.setdefault(layout, [])
+        self.idle.move_to_end(layout)
+        if len(idle) < self.size:
+            idle.append(puck_library)
+
+        if len(self.idle) > self.max_layouts:
+            self.idle.popitem(last=False)
+
+
+class BatchingServer:
+    """
+    This class serves board requests from a LibraryPool, collecting the requests that arrive within max_delay seconds
+    of each other (up to max_batch of them) into one micro-batch. Requests for layouts of more than max_spots
+    parking spots are refused, so one request cannot make the server build an arbitrarily large board.
+
+    pool - LibraryPool
+    max_batch - int
+    max_delay - float (seconds)
+    max_spots - int
+    """
+
+    def __init__(self, pool=None, max_batch=64, max_delay=0.002, max_spots=1 << 16):
+        self.pool = LibraryPool() if pool is None else pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_spots = max_spots
+        self.pending = None  # asyncio.Queue of (request, future), created on the running loop
+        self.batcher = None
+
+    def process_batch(self, requests):
+        """
+        This method serves a list of decoded requests together and returns their responses, in the same order.
+        Requests of the same layout are assigned in one vectorized call; a request that cannot be served gets an
+        error response without affecting the others. Every library taken from the pool is given back, even if
+        assigning the batch fails.
+        """
+        responses = [None] * len(requests)
+        groups = collections.defaultdict(list)  # layout -> [(position in requests, library)]
+
+        for idx, request in enumerate(requests):
+            request_id = request.get("id") if isinstance(request, dict) else None
+            try:
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+
+                layout = parse_layout(request.get("layout"))
+                if len(layout) > self.max_spots:
+                    raise ValueError("layouts can have at most {} parking spots".format(self.max_spots))
+
+                coordinates = [(check_coordinate(x_coordinate), check_coordinate(y_coordinate))
+                               for x_coordinate, y_coordinate in request.get("pucks", [])]
+                if len(coordinates) > len(layout):
+                    raise ValueError("There are more pucks than parking spots.")
+            except (TypeError, ValueError, OverflowError) as error:
+                responses[idx] = {"id": request_id, "error": str(error)}
+                continue
+
+            puck_library = self.pool.acquire(layout)
+            groups[layout].append((idx, puck_library))
+            puck_library.load_pucks(coordinates)
+
+        try:
+            for members in groups.values():
+                libraries = [puck_library for _, puck_library in members]
+                for (idx, puck_library), assigned in zip(members, PuckLibrary.assign_batch(libraries)):
+                    request = requests[idx]
+                    gaps = puck_library.check_gaps()
+                    if request.get("fill_gaps", True):
+                        puck_library.fill_gaps()
+
+                    responses[idx] = {"id": request.get("id"),
+                                      "spots": [[ps.get_x_coordinate(), ps.get_y_coordinate()] for ps in assigned],
+                                      "gaps": gaps,
+                                      "pucks": [list(location) for location in puck_library.get_puck_locations()],
+                                      "batch": len(requests)}
+        finally:
+            for members in groups.values():
+                for _, puck_library in members:
+                    self.pool.release(puck_library)
+
+        return responses
+
+    async def submit(self, request):
+        """Queue a decoded request for the next micro-batch and return its response once it has been served."""
+        if self.pending is None:
+            self.pending = asyncio.Queue()
+            self.batcher = asyncio.create_task(self._run_batches())
+
+        future = asyncio.get_running_loop().create_future()
+        await self.pending.put((request, future))
+        return await future
+
+    async def _serve(self, request):
+        """Return the response to a request, or an error response if its micro-batch failed."""
+        try:
+            return await self.submit(request)
+        except Exception as error:
+            request_id = request.get("id") if isinstance(request, dict) else None
+            return {"id": request_id, "error": "internal error: {}".format(error)}
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                responses = self.process_batch([request for request, _ in batch])
+            except Exception as error:
+                # fail this batch only; the batcher keeps serving the requests after it
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            for (_, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    async def handle_connection(self, reader, writer):
+        """Serve the request lines of one connection, writing each response as soon as it and those before it are
+        ready."""
+        responses = asyncio.Queue()
+
+        async def write_responses():
+            while True:
+                task = await responses.get()
+                if task is None:
+                    return
+                writer.write(json.dumps(await task).encode() + b"\n")
+                await writer.drain()
+
+        writing = asyncio.create_task(write_responses())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    request = json.loads(line)
+                except ValueError as error:
+                    task = asyncio.get_running_loop().create_future()
+                    task.set_result({"id": None, "error": "invalid JSON: {}".format(error)})
+                else:
+                    task = asyncio.ensure_future(self._serve(request))
+                await responses.put(task)
+
+            await responses.put(None)
+            await writing
+        finally:
+            writing.cancel()
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        """Start listening on a TCP port, or on a Unix socket when path is given, and return the asyncio server."""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_connection, path)
+
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def close(self):
+        """Stop the batching task."""
+        if self.batcher is not None:
+            self.batcher.cancel()
+            await asyncio.gather(self.batcher, return_exceptions=True)
+            self.batcher = None
+            self.pending = None
+
+
+async def generate_load(host="127.0.0.1", port=8765, path=None, requests=1000, connections=8, layout=DEFAULT_LAYOUT,
+                        seed=0):
+    """
+    This function is the load generator: it opens 'connections' connections to a running server, each sending its
+    share of 'requests' random boards of a layout one at a time (waiting for each response before sending the next),
+    and returns the throughput and latency percentiles as a JSON-compatible dict.
+    """
+    rng = random.Random(seed)
+    boards = [[list(puck) for puck in layout.generate_pucks(None, rng)] for _ in range(requests)]
+    layout_fields = None if layout == DEFAULT_LAYOUT else {
+        "rows": layout.rows, "columns": layout.columns, "pitch": layout.pitch, "origin": list(layout.origin),
+        "board_size": list(layout.board_size)}
+    latencies = []
+    errors = [0]
+
+    async def client(first):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+
+        try:
+            for idx in range(first, requests, connections):
+                request = {"id": idx, "pucks": boards[idx]}
+                if layout_fields is not None:
+                    request["layout"] = layout_fields
+
+                started = time.perf_counter()
+                writer.write(json.dumps(request).encode() + b"\n")
+                await writer.drain()
+                response = json.loads(await reader.readline())
+                latencies.append(time.perf_counter() - started)
+                if "error" in response:
+                    errors[0] += 1
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(first) for first in range(min(connections, requests))))
+    elapsed = time.perf_counter() - started
+
+    result = {"requests": requests, "connections": connections, "errors": errors[0], "seconds": elapsed,
+              "requests_per_second": requests / elapsed if elapsed else 0.0}
+    if latencies:
+        result["latency_ms"] = {"mean": 1000 * sum(latencies) / len(latencies),
+                                "p50": 1000 * percentile(latencies, 0.50), "p95": 1000 * percentile(latencies, 0.95),
+                                "p99": 1000 * percentile(latencies, 0.99), "max": 1000 * max(latencies)}
+
+    return result
+
+
+async def serve(host, port, path, pool_size, pool_layouts, max_batch, max_delay, max_spots):
+    batching_server = BatchingServer(LibraryPool(pool_size, max_layouts=pool_layouts), max_batch, max_delay, max_spots)
+    server = await batching_server.start(host, port, path)
+    print("Serving on", path if path is not None else "{}:{}".format(host, port), file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve puck boards over JSON Lines, or generate load against it.")
+    parser.add_argument("command", choices=("serve", "load"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="Unix socket path (instead of TCP)")
+    parser.add_argument("--pool-size", type=int, default=8, help="idle libraries kept per layout")
+    parser.add_argument("--pool-layouts", type=int, default=16, help="layouts idle libraries are kept for")
+    parser.add_argument("--max-spots", type=int, default=1 << 16, help="largest layout served, in parking spots")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-delay", type=float, default=0.002, help="seconds to wait while collecting a batch")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.pool_size, args.pool_layouts, args.max_batch,
+                              args.max_delay, args.max_spots))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    result = asyncio.run(generate_load(args.host, args.port, args.unix, args.requests, args.connections,
+                                       seed=args.seed))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
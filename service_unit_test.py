@@ -0,0 +1,176 @@
+import asyncio
+import random
+import unittest
+import unittest.mock
+
+from ali_solution import PuckLibrary, check_coordinate
+from board_layout import DEFAULT_LAYOUT, BoardLayout
+from service import *
+
+
+def board(layout, pucks):
+    """Return a library with the parking spots of a layout and pucks at the given coordinates."""
+    puck_library = PuckLibrary()
+    puck_library.populate_parking_spots(layout)
+    puck_library.load_pucks(pucks)
+
+    return puck_library
+
+
+class ServiceTestCase(unittest.TestCase):
+
+    def test_one(self):
+        """Test that batched assignment gives every board the same result as assigning it on its own."""
+        rng = random.Random(1)
+        layout = BoardLayout(6, 7, 40, (20, 20))
+        batch, alone = [], []
+        for _ in range(20):
+            count = rng.randint(0, len(layout))
+            pucks = list(layout.generate_pucks(count, rng))
+            batch.append(board(layout, pucks))
+            alone.append(board(layout, pucks))
+
+        batch_assigned = PuckLibrary.assign_batch(batch)
+        for puck_library, assigned in zip(alone, batch_assigned):
+            self.assertEqual([(ps.get_x_coordinate(), ps.get_y_coordinate()) for ps in puck_library.assign_all()],
+                             [(ps.get_x_coordinate(), ps.get_y_coordinate()) for ps in assigned])
+
+        self.assertRaises(ValueError, PuckLibrary.assign_batch, [batch[0], board(DEFAULT_LAYOUT, [])])
+
+    def test_two(self):
+        """Test that a micro-batch is served by pooled libraries with the same result as a fresh library, and that
+        bad requests get an error without affecting the rest of the batch."""
+        server = BatchingServer(LibraryPool(size=2))
+        requests = [{"id": 1, "pucks": [[400, 400], [100, 100]]},
+                    {"id": 2, "pucks": [[1, 2, 3]]},
+                    {"id": 3, "pucks": [[0, 0]] * 10},
+                    {"id": 4, "pucks": [[50, 50]], "layout": {"rows": 2, "columns": 2, "pitch": 100,
+                                                             "origin": [50, 50]}, "fill_gaps": False},
+                    "not an object"]
+        responses = server.process_batch(requests)
+
+        puck_library = board(DEFAULT_LAYOUT, requests[0]["pucks"])
+        spots = [[ps.get_x_coordinate(), ps.get_y_coordinate()] for ps in puck_library.assign_all()]
+        gaps = puck_library.check_gaps()
+        puck_library.fill_gaps()
+
+        self.assertEqual({"id": 1, "spots": spots, "gaps": gaps, "pucks": [[300, 300], [420, 300]], "batch": 5},
+                         responses[0])
+        self.assertEqual([2, 3, None], [responses[idx]["id"] for idx in (1, 2, 4)])
+        self.assertTrue(all("error" in responses[idx] for idx in (1, 2, 4)))
+        self.assertEqual({"id": 4, "spots": [[50, 50]], "gaps": True, "pucks": [[50, 50]], "batch": 5}, responses[3])
+
+        # libraries went back to the pool empty, and are reused for the next batch
+        self.assertEqual(3, server.pool.created)
+        self.assertEqual(0, server.pool.idle[DEFAULT_LAYOUT][-1].get_occupancy())
+        self.assertFalse(server.pool.idle[DEFAULT_LAYOUT][-1].pucks)
+        self.assertEqual(spots, server.process_batch(requests[:1])[0]["spots"])
+        self.assertEqual(3, server.pool.created)
+
+    def test_three(self):
+        """Test the server end to end with the load generator, over TCP, with concurrent requests batched together."""
+
+        async def run():
+            server = BatchingServer(max_delay=0.01)
+            tcp_server = await server.start(port=0)
+            port = tcp_server.sockets[0].getsockname()[1]
+            try:
+                result = await generate_load(port=port, requests=60, connections=6, seed=3)
+
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b'{"id": "a", "pucks": [[420, 300]]}\nnot json\n{"id": "b", "pucks": []}\n')
+                await writer.drain()
+                responses = [json.loads(await reader.readline()) for _ in range(3)]
+                writer.close()
+                await writer.wait_closed()
+            finally:
+                tcp_server.close()
+                await tcp_server.wait_closed()
+                await server.close()
+
+            return result, responses
+
+        result, responses = asyncio.run(run())
+        self.assertEqual(60, result["requests"])
+        self.assertEqual(0, result["errors"])
+        self.assertTrue(result["requests_per_second"] > 0)
+        self.assertTrue(0 < result["latency_ms"]["p50"] <= result["latency_ms"]["p99"])
+        self.assertEqual(["a", None, "b"], [response["id"] for response in responses])
+        self.assertEqual([[420, 300]], responses[0]["spots"])
+        self.assertIn("error", responses[1])
+        self.assertEqual([], responses[2]["pucks"])
+
+    def test_four(self):
+        """Test that coordinates beyond the range the distance computations support get an error response, and that a
+        batch that fails unexpectedly fails only its own requests: its libraries go back to the pool and the batcher
+        keeps serving."""
+        server = BatchingServer(LibraryPool(size=2), max_delay=0)
+        responses = server.process_batch([{"id": 1, "pucks": [[10 ** 30, 0]]}, {"id": 2, "pucks": [[0, float("inf")]]},
+                                          {"id": 3, "pucks": [[2 ** 31, 0]]}, {"id": 4, "pucks": [[0, -10 ** 15]]},
+                                          {"id": 5, "pucks": [[420, 300]]}, {"id": 6, "pucks": [[-2 ** 25, 2 ** 25]]}])
+        self.assertEqual([1, 2, 3, 4], [response["id"] for response in responses if "error" in response])
+        self.assertEqual([[420, 300]], responses[4]["spots"])
+        self.assertEqual([[180, 300]], responses[5]["spots"])
+        self.assertRaises(OverflowError, check_coordinate, 2 ** 25 + 1)
+        self.assertEqual(-2 ** 25, check_coordinate(-2 ** 25 - 0.4))
+
+        def fail(libraries):
+            raise RuntimeError("assignment failed")
+
+        async def run():
+            try:
+                with unittest.mock.patch.object(PuckLibrary, "assign_batch", fail):
+                    raised = await asyncio.gather(server.submit({"id": 4, "pucks": [[420, 300]]}),
+                                                  return_exceptions=True)
+                    failed = await server._serve({"id": 5, "pucks": [[420, 300]]})
+
+                return raised, failed, await server.submit({"id": 6, "pucks": [[420, 300]]})
+            finally:
+                await server.close()
+
+        raised, failed, response = asyncio.run(asyncio.wait_for(run(), 5))
+        self.assertIsInstance(raised[0], RuntimeError)
+        self.assertEqual({"id": 5, "error": "internal error: assignment failed"}, failed)
+        self.assertEqual([[420, 300]], response["spots"])
+        self.assertEqual(2, len(server.pool.idle[DEFAULT_LAYOUT]))
+        self.assertFalse(any(puck_library.pucks for puck_library in server.pool.idle[DEFAULT_LAYOUT]))
+
+    def test_five(self):
+        """Test that a malformed layout gets an error response without failing the other requests of its batch."""
+        server = BatchingServer(LibraryPool(size=2))
+        bad_layouts = [{"rows": 2, "columns": 2, "origin": [1]}, {"rows": 2, "columns": 2, "origin": {"x": 1}},
+                       {"rows": 2, "columns": 2, "board_size": [1, 2, 3]}, {"rows": 2, "columns": 2, "origin": 5},
+                       {"rows": 2.5, "columns": 2}, {"rows": 2, "columns": 2, "pitch": 10 ** 30},
+                       {"rows": 2, "columns": 2, "origin": [-1, 0]}, {"rows": 2, "columns": 2, "shape": "round"}]
+        requests = [{"id": idx, "pucks": [], "layout": layout} for idx, layout in enumerate(bad_layouts)]
+        requests.append({"id": "good", "pucks": [[420, 300]]})
+
+        responses = server.process_batch(requests)
+        self.assertTrue(all("error" in response for response in responses[:-1]))
+        self.assertEqual(list(range(len(bad_layouts))), [response["id"] for response in responses[:-1]])
+        self.assertEqual([[420, 300]], responses[-1]["spots"])
+
+    def test_six(self):
+        """Test that idle libraries are only kept for the most recently used layouts, and that layouts with too many
+        parking spots are refused."""
+        pool = LibraryPool(size=1, layouts=(), max_layouts=2)
+        layouts = [BoardLayout(1, columns) for columns in (2, 3, 4)]
+        for layout in layouts:
+            pool.release(pool.acquire(layout))
+        self.assertEqual(layouts[1:], list(pool.idle))
+
+        pool.release(pool.acquire(layouts[1]))
+        pool.release(pool.acquire(layouts[0]))
+        self.assertEqual([layouts[1], layouts[0]], list(pool.idle))
+        self.assertEqual(4, pool.created)
+
+        server = BatchingServer(pool, max_spots=6)
+        responses = server.process_batch([{"id": 1, "pucks": [], "layout": {"rows": 2, "columns": 3}},
+                                          {"id": 2, "pucks": [], "layout": {"rows": 7, "columns": 1}}])
+        self.assertEqual([], responses[0]["pucks"])
+        self.assertIn("at most 6 parking spots", responses[1]["error"])
+        self.assertEqual(2, len(pool.idle))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,214 @@
+# Author: Ali Alameedi
+
+# Description: Discrete-event simulation of the puck line. Where move_and_perform_work treats a cycle as instant
+#              rotations of the queue, this module gives every move and every piece of work a duration and plays them
+#              out in time order from a heap of scheduled events. Pucks travel along the path of parking spots one
+#              spot at a time (at a given speed, so a move takes distance / speed), a parking spot holds at most one
+#              puck, and a puck that finds the next spot taken waits where it is (blocking). The head parking spot is
+#              the work station: a puck reaching it is worked on for the service time, then travels back to the tail
+#              of the path as soon as the tail spot is free (until then the station is blocked). The simulation ends
+#              when every puck has been worked on the requested number of times, and reports the makespan, station
+#              utilization and how long each puck spent waiting.
+
+import heapq
+import math
+import random
+import time
+
+# event kinds
+_ARRIVE = 0
+_SERVICE_DONE = 1
+
+
+class SimulationResult:
+    """
+    This class holds the outcome of one simulation run.
+
+    makespan - float (time at which the last required piece of work finished)
+    station_busy - float (time the work station spent working)
+    station_blocked - float (time the work station held a worked puck that could not leave)
+    wait_times - List<float> (per puck, in queue order: time spent waiting for the next parking spot)
+    services - int (pieces of work done)
+    events - int (events processed)
+    wall_seconds - float (real time the run took)
+    """
+
+    def __init__(self, makespan, station_busy, station_blocked, wait_times, services, events, wall_seconds):
+        self.makespan = makespan
+        self.station_busy = station_busy
+        self.station_blocked = station_blocked
+        self.wait_times = wait_times
+        self.services = services
+        self.events = events
+        self.wall_seconds = wall_seconds
+
+    def get_utilization(self):
+        return self.station_busy / self.makespan if self.makespan else 0.0
+
+    def get_events_per_second(self):
+        return self.events / self.wall_seconds if self.wall_seconds else 0.0
+
+    def as_dict(self):
+        return {"makespan": self.makespan, "station_utilization": self.get_utilization(),
+                "station_busy": self.station_busy, "station_blocked": self.station_blocked,
+                "services": self.services, "mean_wait": sum(self.wait_times) / max(1, len(self.wait_times)),
+                "max_wait": max(self.wait_times, default=0.0), "events": self.events,
+                "events_per_second": self.get_events_per_second()}
+
+
+class LineSimulation:
+    """
+    This class simulates the pucks of a PuckLibrary moving along its path of parking spots and being worked on at
+    the head spot. Pucks start on the parking spots they occupy (run assignment and fill_gaps first).
+
+    speed - float (mm per time unit, for moves between neighbouring parking spots)
+    service_time - float, or function(puck position in queue, random.Random) -> float
+    return_time - float (time from the work station back to the tail spot; default: straight-line distance / speed)
+    cycles - int (pieces of work every puck needs before the simulation ends)
+    seed - int (seeds the random.Random passed to a service_time function)
+    """
+
+    def __init__(self, puck_library, speed=120.0, service_time=1.0, return_time=None, cycles=1, seed=0):
+        spots = puck_library.parking_spots
+        if len(spots) < 2:
+            raise ValueError("The simulation needs a path of at least two parking spots.")
+
+        positions = {(ps.get_x_coordinate(), ps.get_y_coordinate()): idx for idx, ps in enumerate(spots)}
+        self.start_spots = []
+        for puck in puck_library.pucks:
+            spot = positions.get((puck.get_x_coordinate(), puck.get_y_coordinate()))
+            if spot is None:
+                raise ValueError("Every puck has to be on a parking spot before simulating.")
+            self.start_spots.append(spot)
+
+        if len(set(self.start_spots)) != len(self.start_spots):
+            raise ValueError("Two pucks are on the same parking spot.")
+
+        if len(self.start_spots) >= len(spots):
+            raise ValueError("Pucks can only circulate with at least one free parking spot on the path.")
+
+        # travel time from each parking spot to the next one along the path
+        self.travel_times = [math.dist((a.get_x_coordinate(), a.get_y_coordinate()),
+                                       (b.get_x_coordinate(), b.get_y_coordinate())) / speed
+                             for a, b in zip(spots, spots[1:])]
+        if return_time is None:
+            head, tail = spots[-1], spots[0]
+            return_time = math.dist((head.get_x_coordinate(), head.get_y_coordinate()),
+                                    (tail.get_x_coordinate(), tail.get_y_coordinate())) / speed
+
+        self.return_time = return_time
+        self.service_time = service_time
+        self.cycles = cycles
+        self.seed = seed
+
+    def run(self):
+        """
+        This method plays the simulation out and returns a SimulationResult.
+
+        Time Complexity: O(E log P) for E events with P pucks in flight.
+        """
+        started = time.perf_counter()
+        head = len(self.travel_times)
+        travel_times, return_time, cycles = self.travel_times, self.return_time, self.cycles
+        service_time = self.service_time
+        if callable(service_time):
+            rng = random.Random(self.seed)
+            next_service = lambda puck: service_time(puck, rng)
+        else:
+            next_service = lambda puck: service_time
+
+        puck_count = len(self.start_spots)
+        occupant = [-1] * (head + 1)  # puck on (or travelling to) each parking spot
+        idle_since = [None] * puck_count  # when a waiting puck started waiting
+        wait_times = [0.0] * puck_count
+        remaining = [cycles] * puck_count
+        unfinished = puck_count if cycles > 0 else 0
+
+        heap = []
+        push, pop = heapq.heappush, heapq.heappop
+        sequence = 0
+        events = 0
+        now = 0.0
+        makespan = 0.0
+        station_busy = 0.0
+        station_blocked = 0.0
+        blocked_since = None  # when the worked puck at the station started waiting for the tail spot
+
+        for puck, spot in enumerate(self.start_spots):
+            occupant[spot] = puck
+
+        # pucks already in place start as if they had just arrived, head first so the path clears front to back
+        for puck in sorted(range(puck_count), key=lambda p: -self.start_spots[p]):
+            push(heap, (0.0, sequence, _ARRIVE, puck, self.start_spots[puck]))
+            sequence += 1
+
+        while heap and unfinished:
+            now, _, kind, puck, spot = pop(heap)
+            events += 1
+
+            if kind == _ARRIVE:
+                if spot == head:
+                    duration = next_service(puck)
+                    station_busy += duration
+                    push(heap, (now + duration, sequence, _SERVICE_DONE, puck, spot))
+                    sequence += 1
+                    continue
+
+                # move on if the next spot is free, otherwise wait here
+                if occupant[spot + 1] != -1:
+                    idle_since[puck] = now
+                    continue
+
+                moving, position = puck, spot
+
+            else:
+                remaining[puck] -= 1
+                if remaining[puck] == 0:
+                    unfinished -= 1
+                    makespan = now
+
+                if occupant[0] != -1:
+                    blocked_since = now
+                    continue
+
+                occupant[0] = puck
+                occupant[head] = -1
+                push(heap, (now + return_time, sequence, _ARRIVE, puck, 0))
+                sequence += 1
+                moving, position = None, head
+
+            # a parking spot was just freed (or a puck is about to leave one): let the pucks behind it move up,
+            # one after another, as far back as the chain of waiting pucks goes
+            while True:
+                if moving is not None:
+                    occupant[position + 1] = moving
+                    occupant[position] = -1
+                    push(heap, (now + travel_times[position], sequence, _ARRIVE, moving, position + 1))
+                    sequence += 1
+
+                freed = position
+                if freed == 0:
+                    # the tail is free: a worked puck blocked at the station can come back
+                    if blocked_since is not None and occupant[0] == -1:
+                        station_blocked += now - blocked_since
+                        blocked_since = None
+                        returning = occupant[head]
+                        occupant[0] = returning
+                        occupant[head] = -1
+                        push(heap, (now + return_time, sequence, _ARRIVE, returning, 0))
+                        sequence += 1
+                        moving, position = None, head
+                        continue
+
+                    break
+
+                behind = occupant[freed - 1]
+                if behind == -1 or idle_since[behind] is None:
+                    break
+
+                wait_times[behind] += now - idle_since[behind]
+                idle_since[behind] = None
+                moving, position = behind, freed - 1
+
+        return SimulationResult(makespan, station_busy, station_blocked, wait_times, puck_count * cycles, events,
+                                time.perf_counter() - started)
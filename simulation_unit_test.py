@@ -0,0 +1,78 @@
+import random
+import unittest
+
+from ali_solution import Puck, PuckLibrary
+from board_layout import BoardLayout
+from simulation import *
+
+
+def line(layout, spots):
+    """Return a library with one puck on each of the given parking spot positions."""
+    puck_library = PuckLibrary()
+    puck_library.populate_parking_spots(layout)
+    for spot in spots:
+        puck = Puck(puck_library.puck_store)
+        puck_library.pucks.append(puck)
+        puck_library.move_puck(puck, puck_library.parking_spots[spot])
+
+    return puck_library
+
+
+class SimulationTestCase(unittest.TestCase):
+
+    def test_one(self):
+        """Test a hand-computed run: the second puck waits for the head spot while the first one is worked on."""
+        result = LineSimulation(line(BoardLayout(3, 3), [7, 8]), speed=120, service_time=2).run()
+        self.assertAlmostEqual(5.0, result.makespan)
+        self.assertEqual([2.0, 0.0], result.wait_times)
+        self.assertAlmostEqual(0.8, result.get_utilization())
+        self.assertEqual(0.0, result.station_blocked)
+
+    def test_two(self):
+        """Test hand-computed runs, including one where a slow return trip blocks the station."""
+        result = LineSimulation(line(BoardLayout(1, 3, 100, (50, 50)), [0, 2]), speed=100, service_time=1,
+                                return_time=1, cycles=2).run()
+        self.assertEqual(4, result.services)
+        self.assertAlmostEqual(7.0, result.makespan)
+        self.assertAlmostEqual(4 / 7, result.get_utilization())
+        self.assertEqual(0.0, result.station_blocked)
+
+        # the head puck takes until t=5.5 to reach the tail, so the second puck is stuck on the station from t=2
+        result = LineSimulation(line(BoardLayout(1, 4, 100, (50, 50)), [1, 2, 3]), speed=100, service_time=0.5,
+                                return_time=5).run()
+        self.assertAlmostEqual(7.0, result.makespan)
+        self.assertAlmostEqual(3.5, result.station_blocked)
+        self.assertAlmostEqual(1.5, result.station_busy)
+        self.assertEqual([4.5, 0.5, 0.0], result.wait_times)
+
+    def test_three(self):
+        """Test that a large generated board runs to completion with every puck worked the requested number of
+        times."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots(BoardLayout(20, 20, 40, (20, 20)))
+        puck_library.populate_pucks(300, random.Random(3))
+        puck_library.assign_all()
+        puck_library.fill_gaps()
+
+        service_times = []
+
+        def service_time(puck, rng):
+            service_times.append(puck)
+            return rng.uniform(0.5, 1.5)
+
+        result = LineSimulation(puck_library, speed=40, service_time=service_time, cycles=3, seed=3).run()
+        self.assertEqual(900, len(service_times))
+        self.assertEqual([3] * 300, [service_times.count(puck) for puck in range(300)])
+        self.assertTrue(result.makespan > 0 and 0 < result.get_utilization() <= 1)
+        self.assertEqual(300, len(result.wait_times))
+
+    def test_four(self):
+        """Test that a line without a free parking spot, or with pucks off the path, is refused."""
+        self.assertRaises(ValueError, LineSimulation, line(BoardLayout(1, 2, 100, (50, 50)), [0, 1]))
+        puck_library = line(BoardLayout(3, 3), [8])
+        puck_library.pucks[0].set_x_coordinate(1)
+        self.assertRaises(ValueError, LineSimulation, puck_library)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,250 @@
+# Author: Ali Alameedi
+
+# Description: Binary snapshots of a PuckLibrary, for checkpointing long simulations and recovering from crashes. A
+#              snapshot is a small versioned header followed by contiguous typed arrays (the same struct-of-arrays
+#              layout as PuckStore and SpotStore): parking spot coordinates and occupied flags in path order, then puck
+#              coordinates and work complete flags in queue order. Saving writes every array in bulk. Loading
+#              memory-maps the file, so it takes about the same time for any board size; Puck and ParkingSpot views
+#              are only created when they are accessed. restore builds a PuckLibrary whose parking spots stay in the
+#              mapped file and are only created when they are used, so restoring a board does not depend on its number
+#              of parking spots.
+#
+# File layout (little-endian):
+#   header      magic b"PUCKSNAP", version (uint32), flags (uint32), spot count S (int64), puck count K (int64),
+#               layout rows, columns, pitch, origin x, origin y, board width, board height (7 x int64, zero if none)
+#   arrays      spot x, spot y (S x int64), puck x, puck y (K x int64), occupied (S bytes), work complete (K bytes)
+#
+# On big-endian machines the int64 arrays are byteswapped into memory when a snapshot is loaded.
+
+import array
+import collections.abc
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+from ali_solution import ParkingSpot, Puck, PuckLibrary, PuckStore, SpotStore
+from board_layout import DEFAULT_LAYOUT, BoardLayout
+
+MAGIC = b"PUCKSNAP"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sIIqq7q")
+_FLAG_LAYOUT = 1  # the library has a board layout
+_FLAG_PATH_COMPACTED = 2  # pucks sit on the last K spots in queue order (see PuckLibrary.path_compacted)
+
+
+def save(puck_library, path):
+    """
+    This function writes a snapshot of a library to path. The snapshot is written to a temporary file first and then
+    moved into place, so a crash while saving leaves the previous snapshot intact.
+
+    Time Complexity: O(N + S), as bulk array copies
+    """
+    pucks = list(puck_library.pucks)
+    spot_x, spot_y = puck_library._spot_coordinates()
+    if pucks:
+        puck_x, puck_y = puck_library._puck_coordinates(pucks)
+    else:
+        puck_x = puck_y = np.empty(0, dtype=np.int64)
+
+    store = puck_library.puck_store
+    if all(puck.store is store for puck in pucks):
+        indices = np.fromiter((puck.index for puck in pucks), dtype=np.intp, count=len(pucks))
+        work_complete = np.frombuffer(store.work_complete, dtype=np.uint8)[indices]
+    else:
+        work_complete = np.fromiter((puck.get_work_complete_status() for puck in pucks), dtype=np.uint8,
+                                    count=len(pucks))
+
+    if puck_library.spots_in_store:
+        occupied = np.frombuffer(puck_library.spot_store.occupied, dtype=np.uint8)
+    else:
+        occupied = np.array(puck_library._occupied_statuses(), dtype=np.uint8)
+
+    layout = puck_library.layout
+    flags = (_FLAG_LAYOUT if layout is not None else 0) | (_FLAG_PATH_COMPACTED if puck_library.path_compacted else 0)
+    layout_fields = (0,) * 7 if layout is None else (layout.rows, layout.columns, layout.pitch, layout.origin[0],
+                                                     layout.origin[1], layout.board_size[0], layout.board_size[1])
+    header = _HEADER.pack(MAGIC, VERSION, flags, len(spot_x), len(pucks), *layout_fields)
+
+    temporary_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary_path, "wb") as stream:
+        stream.write(header)
+        for values in (spot_x, spot_y, puck_x, puck_y):
+            stream.write(np.ascontiguousarray(values, dtype="<i8").data)
+        stream.write(np.ascontiguousarray(occupied).data)
+        stream.write(np.ascontiguousarray(work_complete).data)
+
+    os.replace(temporary_path, path)
+
+
+class ViewSequence(collections.abc.Sequence):
+    """
+    This class is a read-only sequence of Puck or ParkingSpot views of a store that creates each view the first time
+    it is accessed. The view is then kept, so the same index always gives the same object.
+    """
+
+    def __init__(self, view_class, store, count):
+        self.view_class = view_class
+        self.store = store
+        self.views = [None] * count
+
+    def __len__(self):
+        return len(self.views)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self.views)))]
+
+        view = self.views[idx]
+        if view is None:
+            view = self.views[idx] = self.view_class.view(self.store, idx % len(self.views))
+
+        return view
+
+
+class Snapshot:
+    """
+    This class is a snapshot file mapped into memory. Its stores read the mapped arrays directly; changes made through
+    them stay in memory and are never written back to the file. Loading does not depend on the size of the board:
+    the data is paged in as it is read (on big-endian machines the int64 arrays are byteswapped copies instead).
+
+    version - int
+    layout - BoardLayout or None
+    path_compacted - boolean
+    puck_store - PuckStore (fixed size, in queue order: puck i is the i-th puck of the queue)
+    spot_store - SpotStore (fixed size, in path order)
+    pucks - ViewSequence of Puck
+    parking_spots - ViewSequence of ParkingSpot
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as stream:
+            try:
+                self.mapping = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_COPY)
+            except ValueError:
+                raise ValueError("{} is not a snapshot (empty file).".format(path))
+
+        try:
+            if len(self.mapping) < _HEADER.size:
+                raise ValueError("{} is not a snapshot (file too short).".format(path))
+
+            magic, self.version, flags, spot_count, puck_count, *layout_fields = _HEADER.unpack_from(self.mapping)
+            if magic != MAGIC:
+                raise ValueError("{} is not a snapshot (bad magic).".format(path))
+
+            if self.version != VERSION:
+                raise ValueError("Unsupported snapshot version {} (expected {}).".format(self.version, VERSION))
+
+            if len(self.mapping) != _HEADER.size + 17 * (spot_count + puck_count):
+                raise ValueError("{} is truncated or corrupt.".format(path))
+
+            self.layout = None
+            if flags & _FLAG_LAYOUT:
+                rows, columns, pitch, origin_x, origin_y, width, height = layout_fields
+                self.layout = BoardLayout(rows, columns, pitch, (origin_x, origin_y), (width, height))
+                if self.layout == DEFAULT_LAYOUT:
+                    self.layout = DEFAULT_LAYOUT
+
+            self.path_compacted = bool(flags & _FLAG_PATH_COMPACTED)
+        except Exception:
+            self.mapping.close()
+            raise
+
+        data = memoryview(self.mapping)
+        offset = _HEADER.size
+
+        def take(count, item_size, typecode):
+            nonlocal offset
+            section = data[offset:offset + count * item_size].cast(typecode)
+            offset += count * item_size
+            if item_size > 1 and sys.byteorder != "little":
+                # the file is little-endian: load a byteswapped copy of the array
+                swapped = array.array(typecode, section.tobytes())
+                swapped.byteswap()
+                section.release()
+                return swapped
+
+            return section
+
+        self.spot_store = SpotStore.__new__(SpotStore)
+        self.puck_store = PuckStore.__new__(PuckStore)
+        self.spot_store.x_coordinates = take(spot_count, 8, "q")
+        self.spot_store.y_coordinates = take(spot_count, 8, "q")
+        self.puck_store.x_coordinates = take(puck_count, 8, "q")
+        self.puck_store.y_coordinates = take(puck_count, 8, "q")
+        self.spot_store.occupied = take(spot_count, 1, "B")
+        self.puck_store.work_complete = take(puck_count, 1, "B")
+        data.release()
+
+        self.pucks = ViewSequence(Puck, self.puck_store, puck_count)
+        self.parking_spots = ViewSequence(ParkingSpot, self.spot_store, spot_count)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap the file. Views of this snapshot, and libraries built by to_library, cannot be used afterwards."""
+        for store, fields in ((self.spot_store, SpotStore.__slots__), (self.puck_store, PuckStore.__slots__)):
+            for field in fields:
+                values = getattr(store, field)
+                if isinstance(values, memoryview):
+                    values.release()
+
+        self.mapping.close()
+
+    def get_occupancy(self):
+        """Return the occupancy bitmap of the parking spots (bit i set when parking spot i is occupied)."""
+        occupied = np.frombuffer(bytes(self.spot_store.occupied), dtype=np.uint8)
+        return int.from_bytes(np.packbits(occupied, bitorder="little").tobytes(), "little")
+
+    def to_library(self, events=None):
+        """
+        This method builds a PuckLibrary with the state of this snapshot. Its spot store is this snapshot's mapped
+        spot store and its parking_spots is the lazy ViewSequence over it, so no spot array is copied, a ParkingSpot
+        view is only created when that spot is used, and the occupancy bitmap is only built when it is first needed.
+        The puck queue is a deque that the work cycle rotates and add_puck grows, so the puck arrays are copied into
+        an ordinary growable store and one view is created per puck.
+
+        Limitations: the library reads the mapped file, so this snapshot must stay open for as long as the library is
+        used (restore takes care of that), and its parking spots are fixed (populate_parking_spots cannot add to
+        them).
+
+        Time Complexity: O(K) for K pucks, independent of the number of parking spots
+        """
+        puck_library = PuckLibrary(events)
+        puck_library.layout = self.layout
+        puck_library.spot_store = self.spot_store
+        puck_library.parking_spots = self.parking_spots
+
+        puck_store = puck_library.puck_store
+        for field in ("x_coordinates", "y_coordinates"):
+            getattr(puck_store, field).frombytes(memoryview(getattr(self.puck_store, field)).cast("B"))
+        puck_store.work_complete[:] = self.puck_store.work_complete
+
+        puck_library.pucks.extend(Puck.view(puck_store, idx) for idx in range(len(puck_store)))
+        puck_library.path_compacted = self.path_compacted
+        return puck_library
+
+
+def load(path):
+    """This function memory-maps a snapshot written by save and returns it as a Snapshot. Raises ValueError if the
+    file is not a snapshot of a supported version."""
+    return Snapshot(path)
+
+
+def restore(path, events=None):
+    """
+    This function returns a PuckLibrary with the state saved in a snapshot file (see Snapshot.to_library for how it
+    is built lazily). The file stays mapped for as long as the library uses it, and changes to the library are never
+    written back to it. save replaces the file rather than writing into it, so a library can be saved over the file
+    it was restored from.
+
+    Time Complexity: O(K) for K pucks, independent of the number of parking spots
+    """
+    return Snapshot(path).to_library(events)
@@ -0,0 +1,143 @@
+import array
+import os
+import random
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+from ali_solution import ParkingSpot, PuckLibrary
+from board_layout import DEFAULT_LAYOUT, BoardLayout
+from snapshot import *
+
+
+def library_state(puck_library):
+    """Return everything a snapshot has to preserve about a library, as plain data."""
+    return (puck_library.layout, puck_library.path_compacted, puck_library.get_puck_locations(),
+            [puck.get_work_complete_status() for puck in puck_library.pucks],
+            [(ps.get_x_coordinate(), ps.get_y_coordinate(), ps.get_occupied_status())
+             for ps in puck_library.parking_spots], puck_library.get_occupancy())
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "board.snap")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_one(self):
+        """Test that a restored library has the saved state, and can carry on exactly as the original does."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots(BoardLayout(6, 7, 40, (20, 20)))
+        puck_library.populate_pucks(25, random.Random(1))
+        puck_library.assign_all()
+        puck_library.fill_gaps()
+        puck_library.advance()
+        puck_library.remove_puck(puck_library.pucks[3])
+
+        save(puck_library, self.path)
+        restored = restore(self.path)
+        self.assertEqual(library_state(puck_library), library_state(restored))
+
+        for each in (puck_library, restored):
+            each.add_puck(5, 5)
+            each.advance()
+            each.move_and_perform_work()
+        self.assertEqual(library_state(puck_library), library_state(restored))
+
+    def test_two(self):
+        """Test that the default board, an empty library and parking spots added by hand (no layout) round trip."""
+        default = PuckLibrary()
+        default.populate_parking_spots()
+        default.populate_pucks(4, random.Random(2))
+        default.assign_all()
+
+        by_hand = PuckLibrary()
+        by_hand.parking_spots.append(ParkingSpot(7, 8))
+        by_hand.parking_spots.append(ParkingSpot(9, 10))
+        by_hand.populate_pucks(1)
+        by_hand.assign_all()
+
+        for puck_library in (default, PuckLibrary(), by_hand):
+            save(puck_library, self.path)
+            restored = restore(self.path)
+            self.assertEqual(library_state(puck_library), library_state(restored))
+
+        save(default, self.path)
+        self.assertIs(DEFAULT_LAYOUT, restore(self.path).layout)
+        self.assertEqual([self.path], [os.path.join(self.directory.name, name)
+                                       for name in os.listdir(self.directory.name)])
+
+    def test_three(self):
+        """Test that a loaded snapshot creates views only when they are accessed, that changes made through them are
+        not written to the file, and that files which are not snapshots are refused."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots(BoardLayout(30, 30, 20, (10, 10)))
+        puck_library.populate_pucks(500, random.Random(3))
+        puck_library.assign_all()
+        save(puck_library, self.path)
+
+        with load(self.path) as snapshot:
+            self.assertEqual((VERSION, 500, 900), (snapshot.version, len(snapshot.pucks), len(snapshot.parking_spots)))
+            self.assertEqual([None] * 500, snapshot.pucks.views)
+            puck = snapshot.pucks[-1]
+            self.assertIs(puck, snapshot.pucks[499])
+            self.assertEqual(1, sum(view is not None for view in snapshot.pucks.views))
+            self.assertEqual(puck_library.get_puck_locations()[-1], (puck.get_x_coordinate(), puck.get_y_coordinate()))
+            self.assertEqual(puck_library.get_occupancy(), snapshot.get_occupancy())
+            puck.set_x_coordinate(-1)
+            puck.set_work_complete_status()
+            self.assertEqual(-1, snapshot.puck_store.x_coordinates[499])
+
+        self.assertEqual(library_state(puck_library), library_state(restore(self.path)))
+
+        with open(self.path, "rb") as stream:
+            data = stream.read()
+        for bad in (b"", data[:40], data[:-1], b"NOTASNAP" + data[8:], data[:8] + b"\x02" + data[9:]):
+            with open(self.path, "wb") as stream:
+                stream.write(bad)
+            self.assertRaises(ValueError, load, self.path)
+
+    def test_four(self):
+        """Test that restoring creates no parking spot views and copies no spot arrays, that the library works on
+        them lazily without changing the file, and that the int64 arrays are byteswapped on big-endian machines."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots(BoardLayout(20, 20, 20, (10, 10)))
+        puck_library.populate_pucks(30, random.Random(4))
+        puck_library.assign_all()
+        puck_library.fill_gaps()
+        puck_library.advance()
+        save(puck_library, self.path)
+        with open(self.path, "rb") as stream:
+            data = stream.read()
+
+        restored = restore(self.path)
+        self.assertIsInstance(restored.parking_spots, ViewSequence)
+        self.assertIsInstance(restored.spot_store.x_coordinates, memoryview)
+        self.assertEqual([None] * 400, restored.parking_spots.views)
+
+        self.assertEqual(puck_library.get_occupancy(), restored.get_occupancy())
+        self.assertEqual(puck_library.check_gaps(), restored.check_gaps())
+        for each in (puck_library, restored):
+            each.advance()
+            each.remove_puck(each.pucks[10])
+            each.add_puck(0, 0)
+        self.assertTrue(sum(view is not None for view in restored.parking_spots.views) < 100)
+        self.assertEqual(library_state(puck_library), library_state(restored))
+        with open(self.path, "rb") as stream:
+            self.assertEqual(data, stream.read())
+
+        with unittest.mock.patch.object(sys, "byteorder", "big"):
+            with load(self.path) as snapshot:
+                x_coordinates = snapshot.spot_store.x_coordinates
+                self.assertIsInstance(x_coordinates, array.array)
+                x_coordinates.byteswap()
+                self.assertEqual(restored.spot_store.x_coordinates.tolist(), x_coordinates.tolist())
+                self.assertEqual(list(restored.spot_store.occupied), list(snapshot.spot_store.occupied))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,12 @@
+import asyncio
+import collections
+import concurrent.futures
+import random
+import threading
+import time
 import unittest
 from ali_solution import *
+from board_layout import BoardLayout
 
 
 class MyTestCase(unittest.TestCase):
@@ -104,6 +111,369 @@ class MyTestCase(unittest.TestCase):
 
         self.assertCountEqual(puck_original_state, puck_final_state)
 
+    def test_twelve(self):
+        """Test that batch assignment matches assigning each puck to its closest parking spot one at a time."""
+        rng = random.Random(12)
+        for _ in range(25):
+            coordinates = [(rng.randint(0, 480), rng.randint(0, 480)) for _ in range(rng.randint(1, 9))]
+
+            sequential = PuckLibrary()
+            sequential.populate_parking_spots()
+            batch = PuckLibrary()
+            batch.populate_parking_spots()
+
+            for x, y in coordinates:
+                for library in (sequential, batch):
+                    puck = Puck()
+                    puck.set_x_coordinate(x)
+                    puck.set_y_coordinate(y)
+                    library.pucks.append(puck)
+
+            for puck in sequential.pucks:
+                sequential.calculate_closest_parking_spot(puck)
+            batch.assign_all()
+
+            self.assertEqual([(p.get_x_coordinate(), p.get_y_coordinate()) for p in sequential.pucks],
+                             [(p.get_x_coordinate(), p.get_y_coordinate()) for p in batch.pucks])
+            self.assertEqual([ps.get_occupied_status() for ps in sequential.parking_spots],
+                             [ps.get_occupied_status() for ps in batch.parking_spots])
+
+    def test_thirteen(self):
+        """Test that batch assignment refuses to place more pucks than there are unoccupied parking spots."""
+        pucks = [Puck() for _ in range(10)]
+        self.assertRaises(ValueError, self.puck_library.assign_all, pucks)
+
+    def test_fourteen(self):
+        """Test that the free spot index returns the same parking spot as a linear scan while the board fills up,
+        including ties, and that spots freed by filling gaps come back into the index."""
+        rng = random.Random(14)
+        library = PuckLibrary()
+        for x in range(0, 1200, 60):
+            for y in range(0, 600, 40):
+                library.parking_spots.append(ParkingSpot(x, y))
+
+        for _ in range(len(library.parking_spots)):
+            puck = Puck()
+            puck.set_x_coordinate(rng.randint(-100, 1300))
+            puck.set_y_coordinate(rng.choice([20, rng.randint(-100, 700)]))
+            expected = library.scan_closest_parking_spot(puck)
+            self.assertIs(expected, library.find_closest_parking_spot(puck))
+            library.pucks.append(puck)
+            library.move_puck(puck, expected)
+
+        self.assertIsNone(library.find_closest_parking_spot(Puck()))
+
+    def test_fifteen(self):
+        """Test that after filling gaps the free spot index holds exactly the unoccupied parking spots."""
+        for puck in self.puck_library.pucks:
+            self.puck_library.calculate_closest_parking_spot(puck)
+        self.puck_library.fill_gaps()
+
+        index = self.puck_library.get_free_spot_index()
+        free = [idx for idx, ps in enumerate(self.puck_library.parking_spots) if not ps.get_occupied_status()]
+        self.assertEqual(len(free), len(index))
+        for idx in free:
+            self.assertIn(idx, index._bucket(idx))
+
+    def test_sixteen(self):
+        """Test that cycling the puck queue works every puck once and leaves the queue in its original order, whether
+        the pucks are held in the default deque or in a plain list."""
+        for pucks in (self.puck_library.pucks, list(self.puck_library.pucks)):
+            self.puck_library.pucks = pucks
+            original_order = list(pucks)
+            self.puck_library.move_and_perform_work()
+            self.assertIs(pucks, self.puck_library.pucks)
+            self.assertEqual(original_order, list(self.puck_library.pucks))
+            self.assertTrue(all(puck.get_work_complete_status() for puck in self.puck_library.pucks))
+
+    def test_seventeen(self):
+        """Test that the rotate compatibility method moves the last element to the front of a list or a deque."""
+        for arr in ([1, 2, 3, 4], collections.deque([1, 2, 3, 4])):
+            self.puck_library.rotate(arr, len(arr))
+            self.assertEqual([4, 1, 2, 3], list(arr))
+
+        arr = [1, 2, 3, 4]
+        self.puck_library.rotate(arr, 3)
+        self.assertEqual([3, 1, 2, 4], arr)
+
+    def test_eighteen(self):
+        """Test that the occupancy bitmap gap check agrees with walking the parking spots, before and after filling
+        gaps, and that the bitmap tracks every parking spot's occupied status."""
+        rng = random.Random(18)
+        for _ in range(50):
+            puck_library = PuckLibrary()
+            puck_library.populate_parking_spots()
+            puck_library.populate_pucks(rng=rng)
+            puck_library.assign_all()
+
+            for _ in range(2):
+                statuses = [ps.get_occupied_status() for ps in puck_library.parking_spots]
+                self.assertEqual(statuses, puck_library._occupied_statuses())
+                first_occupied = statuses.index(True)
+                self.assertEqual(not all(statuses[first_occupied:]), puck_library.check_gaps())
+                puck_library.fill_gaps()
+
+            self.assertFalse(puck_library.check_gaps())
+            self.assertEqual(len(puck_library.pucks), puck_library.get_occupancy().bit_count())
+
+    def test_nineteen(self):
+        """Test that filling gaps places the pucks on the last spots of the path in queue order."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots()
+        for x, y in [(180, 60), (420, 180), (180, 300)]:
+            puck = Puck()
+            puck.set_x_coordinate(x)
+            puck.set_y_coordinate(y)
+            puck_library.pucks.append(puck)
+
+        puck_library.assign_all()
+        self.assertTrue(puck_library.check_gaps())
+        puck_library.fill_gaps()
+        self.assertEqual([(180, 300), (300, 300), (420, 300)],
+                         [(p.get_x_coordinate(), p.get_y_coordinate()) for p in puck_library.pucks])
+        self.assertEqual(0b111000000, puck_library.get_occupancy())
+
+    def test_twenty(self):
+        """Test that pucks and parking spots populated by the library are slotted views into its array stores."""
+        self.assertEqual(len(self.puck_library.pucks), len(self.puck_library.puck_store))
+        self.assertEqual(9, len(self.puck_library.spot_store))
+        self.assertFalse(hasattr(Puck(), "__dict__"))
+        self.assertFalse(hasattr(ParkingSpot(0, 0), "__dict__"))
+
+        puck = self.puck_library.pucks[0]
+        self.assertIs(self.puck_library.puck_store, puck.store)
+        puck.set_x_coordinate(123)
+        puck.set_work_complete_status()
+        self.assertEqual(123, self.puck_library.puck_store.x_coordinates[puck.index])
+        self.assertEqual((123, True), (puck.x_coordinate, puck.work_complete))
+        self.assertEqual(123, Puck.view(puck.store, puck.index).get_x_coordinate())
+
+        parking_spot = self.puck_library.parking_spots[4]
+        self.assertEqual((300, 180), (parking_spot.x_coordinate, parking_spot.y_coordinate))
+        parking_spot.set_occupied_status()
+        self.assertEqual(1, self.puck_library.spot_store.occupied[4])
+        self.assertTrue(ParkingSpot.view(self.puck_library.spot_store, 4).get_occupied_status())
+
+    def test_twenty_one(self):
+        """Test that asynchronous work runs concurrently up to the requested limit, works every puck exactly once and
+        leaves the queue in its original order."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots()
+        puck_library.populate_pucks(9, random.Random(21))
+        original_order = list(puck_library.pucks)
+        worked = []
+        running = [0, 0]  # currently running, most running at once
+
+        async def work(puck):
+            running[0] += 1
+            running[1] = max(running)
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            worked.append(puck)
+
+        asyncio.run(puck_library.move_and_perform_work_async(work, concurrency=3))
+        self.assertEqual(3, running[1])
+        self.assertCountEqual(original_order, worked)
+        self.assertEqual(original_order, list(puck_library.pucks))
+        self.assertTrue(all(puck.get_work_complete_status() for puck in puck_library.pucks))
+
+    def test_twenty_two(self):
+        """Test that an error raised by asynchronous work is raised once the cycle is over, and that the puck it was
+        raised for is not marked as worked on."""
+        failing = self.puck_library.pucks[-1]
+
+        async def work(puck):
+            if puck is failing:
+                raise RuntimeError("instrument offline")
+
+        self.assertRaises(RuntimeError, asyncio.run, self.puck_library.move_and_perform_work_async(work))
+        self.assertFalse(failing.get_work_complete_status())
+        self.assertEqual(len(self.puck_library.pucks) - 1,
+                         sum(puck.get_work_complete_status() for puck in self.puck_library.pucks))
+
+        # no workers, or no room for a pending puck, would hang the cycle forever
+        for options in ({"concurrency": 0}, {"max_pending": 0}):
+            self.assertRaises(ValueError, asyncio.run, self.puck_library.move_and_perform_work_async(work, **options))
+
+    def test_twenty_three(self):
+        """Test that parallel work runs one puck per station at a time, works every puck exactly once and leaves the
+        queue in its original order."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots()
+        puck_library.populate_pucks(9, random.Random(23))
+        original_order = list(puck_library.pucks)
+        worked = []
+        running = [0, 0]  # currently running, most running at once
+        lock = threading.Lock()
+
+        def work(puck):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+                worked.append(puck)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            puck_library.move_and_perform_work_parallel(work, stations=4, executor=executor)
+
+        self.assertEqual(4, running[1])
+        self.assertCountEqual(original_order, worked)
+        self.assertEqual(original_order, list(puck_library.pucks))
+        self.assertTrue(all(puck.get_work_complete_status() for puck in puck_library.pucks))
+
+    def test_twenty_four(self):
+        """Test that an error raised by parallel work is raised once the cycle is over without marking that puck, and
+        that a station count below one is refused."""
+        failing = self.puck_library.pucks[0]
+
+        def work(puck):
+            if puck is failing:
+                raise RuntimeError("instrument offline")
+
+        self.assertRaises(RuntimeError, self.puck_library.move_and_perform_work_parallel, work, 3)
+        self.assertFalse(failing.get_work_complete_status())
+        self.assertEqual(len(self.puck_library.pucks) - 1,
+                         sum(puck.get_work_complete_status() for puck in self.puck_library.pucks))
+        self.assertRaises(ValueError, self.puck_library.move_and_perform_work_parallel, work, 0)
+
+    def test_twenty_five(self):
+        """Test that random sequences of add_puck, remove_puck and advance leave the board exactly as recomputing it
+        from scratch would: assigning every puck in the queue and compacting the path."""
+        layout = BoardLayout(4, 5, 60, (30, 30))
+        rng = random.Random(25)
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots(layout)
+        puck_library.populate_pucks(6, rng)
+        puck_library.assign_all()
+        puck_library.fill_gaps()
+        arrivals = {puck: puck_library.get_puck_locations()[idx] for idx, puck in enumerate(puck_library.pucks)}
+
+        for step in range(400):
+            operation = rng.choice(("add", "remove", "advance"))
+            if operation == "add" and len(puck_library.pucks) < len(layout):
+                coordinates = next(layout.generate_pucks(1, rng))
+                parking_spot = puck_library.add_puck(*coordinates)
+                arrivals[puck_library.pucks[0]] = coordinates
+                self.assertEqual((parking_spot.get_x_coordinate(), parking_spot.get_y_coordinate()),
+                                 puck_library.get_puck_locations()[0])
+            elif operation == "remove" and puck_library.pucks:
+                puck_library.remove_puck(rng.choice(list(puck_library.pucks)))
+            elif operation == "advance":
+                head_puck = puck_library.pucks[-1] if puck_library.pucks else None
+                self.assertIs(head_puck, puck_library.advance())
+
+            # full recompute on a fresh library, from the arrival positions of the pucks in queue order
+            reference = PuckLibrary()
+            reference.populate_parking_spots(layout)
+            for puck in puck_library.pucks:
+                new_puck = Puck(reference.puck_store)
+                new_puck.set_x_coordinate(arrivals[puck][0])
+                new_puck.set_y_coordinate(arrivals[puck][1])
+                if puck.get_work_complete_status():
+                    new_puck.set_work_complete_status()
+                reference.pucks.append(new_puck)
+            reference.assign_all()
+            reference._compact()
+
+            self.assertEqual(reference.get_puck_locations(), puck_library.get_puck_locations())
+            self.assertEqual(reference.get_occupancy(), puck_library.get_occupancy())
+            self.assertEqual(reference._occupied_statuses(), [ps.get_occupied_status() for ps in
+                                                              puck_library.parking_spots])
+            self.assertEqual([puck.get_work_complete_status() for puck in reference.pucks],
+                             [puck.get_work_complete_status() for puck in puck_library.pucks])
+            self.assertFalse(puck_library.check_gaps())
+            if len(puck_library.pucks) < len(layout):
+                probe = Puck()
+                probe.set_x_coordinate(rng.randint(0, layout.get_width()))
+                probe.set_y_coordinate(rng.randint(0, layout.get_height()))
+                self.assertIs(puck_library.scan_closest_parking_spot(probe),
+                              puck_library.find_closest_parking_spot(probe))
+
+    def test_twenty_six(self):
+        """Test the incremental updates on the default board by hand, and that they refuse boards they cannot
+        update."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots()
+        self.assertIsNone(puck_library.advance())
+        self.assertIs(puck_library.parking_spots[8], puck_library.add_puck(0, 0))
+        first = puck_library.pucks[0]
+        self.assertIs(puck_library.parking_spots[7], puck_library.add_puck(470, 470))
+        puck_library.add_puck(10, 10)
+        self.assertEqual([(180, 300), (300, 300), (420, 300)], puck_library.get_puck_locations())
+
+        self.assertIs(puck_library.pucks[-1], puck_library.advance())
+        self.assertEqual([(180, 300), (300, 300), (420, 300)], puck_library.get_puck_locations())
+        self.assertTrue(puck_library.pucks[0].get_work_complete_status())
+
+        puck_library.remove_puck(first)
+        self.assertEqual([(300, 300), (420, 300)], puck_library.get_puck_locations())
+        self.assertEqual([False] * 7 + [True] * 2, puck_library._occupied_statuses())
+
+        for _ in range(7):
+            puck_library.add_puck(0, 0)
+        self.assertRaises(ValueError, puck_library.add_puck, 0, 0)
+
+        unplaced = PuckLibrary()
+        unplaced.populate_parking_spots()
+        unplaced.populate_pucks(2)
+        self.assertRaises(ValueError, unplaced.add_puck, 0, 0)
+
+    def test_twenty_seven(self):
+        """Test that views of the same store entry are equal and tracked as the same puck or parking spot, and that
+        non-integer coordinates are rounded to whole millimetres."""
+        puck_library = PuckLibrary()
+        puck_library.populate_parking_spots()
+        self.assertEqual(puck_library.parking_spots[3], ParkingSpot.view(puck_library.spot_store, 3))
+        self.assertEqual(1, len({puck_library.parking_spots[3], ParkingSpot.view(puck_library.spot_store, 3)}))
+        self.assertNotEqual(puck_library.parking_spots[3], ParkingSpot.view(SpotStore(), 3))
+
+        puck = Puck(puck_library.puck_store)
+        puck_library.pucks.append(puck)
+        puck_library.move_puck(puck, ParkingSpot.view(puck_library.spot_store, 3))
+        self.assertEqual(1 << 3, puck_library.get_occupancy())
+        self.assertTrue(puck_library.check_gaps())
+
+        puck_library.fill_gaps()
+        puck_library.remove_puck(Puck.view(puck_library.puck_store, puck.index))
+        self.assertEqual((0, 0), (len(puck_library.pucks), puck_library.get_occupancy()))
+
+        puck.set_x_coordinate(1.5)
+        puck.set_y_coordinate(-2.7)
+        self.assertEqual((2, -3), (puck.get_x_coordinate(), puck.get_y_coordinate()))
+        self.assertEqual((180, 61), (ParkingSpot(179.6, 60.9).get_x_coordinate(), ParkingSpot(0, 60.9).y_coordinate))
+        self.assertRaises(TypeError, puck.set_x_coordinate, "far")
+
+    def test_twenty_eight(self):
+        """Test that pucks far off the board are assigned to their exactly closest parking spot (the squared distances
+        do not wrap around)."""
+        rng = random.Random(28)
+        spots = list(BoardLayout(3, 3, 120, (180, 60), (480, 480)).parking_spot_coordinates())
+        for _ in range(200):
+            x, y = rng.randint(-10 ** 15, 10 ** 15), rng.randint(-10 ** 15, 10 ** 15)
+            puck_library = PuckLibrary()
+            puck_library.populate_parking_spots()
+            puck_library.load_pucks([(x, y)])
+            closest = min(range(len(spots)), key=lambda idx: ((spots[idx][0] - x) ** 2 + (spots[idx][1] - y) ** 2, idx))
+            self.assertEqual([puck_library.parking_spots[closest]], puck_library.assign_all())
+
+    def test_twenty_nine(self):
+        """Test that the closest parking spot of a puck far off the board is found without walking the empty grid
+        rings between the puck and the board."""
+        started = time.perf_counter()
+        for x, y in [(4 * 10 ** 9, 0), (2 * 10 ** 6, 0), (-10 ** 12, 250), (300, -7 * 10 ** 15), (-10 ** 9, 10 ** 9)]:
+            puck_library = PuckLibrary()
+            puck_library.populate_parking_spots()
+            puck = puck_library.load_pucks([(x, y)])[0]
+            closest = min(puck_library.parking_spots, key=lambda ps: (ps.get_x_coordinate() - x) ** 2 +
+                          (ps.get_y_coordinate() - y) ** 2)
+            self.assertIs(closest, puck_library.find_closest_parking_spot(puck))
+            puck_library.calculate_closest_parking_spot(puck)
+            self.assertEqual(closest.get_x_coordinate(), puck.get_x_coordinate())
+
+        self.assertTrue(time.perf_counter() - started < 1)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,258 @@
+# Author: Ali Alameedi
+
+# Description: Streaming replay of recorded boards. Scenarios are read lazily, one board per record, from a JSON Lines
+#              file or a compact binary file, pushed one at a time through the program's stages (assign every puck to
+#              its closest parking spot, fill gaps, do the work cycle), and each result is written to the output file
+#              as soon as it is ready. Every step is a generator and a single warm library is reused per layout, so
+#              memory stays bounded by the largest board, whatever the size of the file.
+#
+# JSONL record: {"id": 1, "pucks": [[x, y], ...], "layout": {"rows": 3, "columns": 3, ...}}   (id, layout optional)
+# Binary file:  header  b"PUCKBIN1" then rows, columns, pitch, origin x, origin y, board width, board height
+#                       (7 x int64 little-endian, the layout of every record)
+#               record  id (int64), puck count (uint32), then x, y (int64) of every puck
+# Result line:  {"id": 1, "spots": [[x, y], ...], "gaps": true, "pucks": [[x, y], ...], "worked": 2}
+#               or {"id": 1, "error": "..."} for a record that could not be processed
+#
+# Usage: python streaming.py boards.jsonl results.jsonl
+#        python streaming.py boards.bin results.jsonl --progress 100000
+#        python streaming.py boards.jsonl boards.bin --convert       (write a JSONL file in the binary format)
+
+import argparse
+import array
+import json
+import struct
+import sys
+import time
+
+from ali_solution import check_coordinate
+from board_layout import DEFAULT_LAYOUT, BoardLayout, grid_layout
+from service import LibraryPool, parse_layout
+
+BINARY_MAGIC = b"PUCKBIN1"
+_LAYOUT = struct.Struct("<7q")
+_RECORD = struct.Struct("<qI")
+
+
+class Scenario:
+    """
+    This class is one recorded board: an id, its layout and the coordinates of its pucks (in queue order).
+
+    record_id - int or any JSON value
+    layout - BoardLayout
+    pucks - [(int, int), ...]
+    """
+
+    __slots__ = ("record_id", "layout", "pucks")
+
+    def __init__(self, record_id, layout, pucks):
+        self.record_id = record_id
+        self.layout = layout
+        self.pucks = pucks
+
+
+class RecordError:
+    """This class is a record that could not be read, passed down the pipeline so it is reported in the output."""
+
+    __slots__ = ("record_id", "message")
+
+    def __init__(self, record_id, message):
+        self.record_id = record_id
+        self.message = message
+
+
+def read_jsonl(stream):
+    """
+    This function generates a Scenario (or a RecordError) for every non-empty line of a JSON Lines text stream.
+    Records without an id are numbered by their line.
+    """
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+
+        record_id = line_number
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("record must be a JSON object")
+
+            record_id = record.get("id", line_number)
+            pucks = [(check_coordinate(x_coordinate), check_coordinate(y_coordinate))
+                     for x_coordinate, y_coordinate in record.get("pucks", [])]
+            yield Scenario(record_id, parse_layout(record.get("layout")), pucks)
+        except (TypeError, ValueError, OverflowError) as error:
+            yield RecordError(record_id, str(error))
+
+
+def read_binary(stream):
+    """
+    This function generates a Scenario for every record of a binary stream (see the format at the top of this
+    module). Only one record is held in memory at a time.
+    """
+    header = stream.read(len(BINARY_MAGIC) + _LAYOUT.size)
+    if header[:len(BINARY_MAGIC)] != BINARY_MAGIC or len(header) != len(BINARY_MAGIC) + _LAYOUT.size:
+        raise ValueError("Not a binary board file (bad header).")
+
+    rows, columns, pitch, origin_x, origin_y, width, height = _LAYOUT.unpack_from(header, len(BINARY_MAGIC))
+    layout = BoardLayout(rows, columns, pitch, (origin_x, origin_y), (width, height))
+    if layout == DEFAULT_LAYOUT:
+        layout = DEFAULT_LAYOUT
+
+    while True:
+        record = stream.read(_RECORD.size)
+        if not record:
+            return
+
+        if len(record) != _RECORD.size:
+            raise ValueError("Truncated record at the end of the binary board file.")
+
+        record_id, count = _RECORD.unpack(record)
+        coordinates = array.array("q")
+        data = stream.read(16 * count)
+        if len(data) != 16 * count:
+            raise ValueError("Truncated record {} in the binary board file.".format(record_id))
+
+        coordinates.frombytes(data)
+        if sys.byteorder != "little":
+            coordinates.byteswap()
+
+        yield Scenario(record_id, layout, list(zip(coordinates[0::2], coordinates[1::2])))
+
+
+def write_binary(scenarios, stream, layout=DEFAULT_LAYOUT):
+    """
+    This function writes scenarios to a binary stream, returning how many were written. Every scenario must have the
+    given layout and an integer id.
+    """
+    stream.write(BINARY_MAGIC + _LAYOUT.pack(layout.rows, layout.columns, layout.pitch, layout.origin[0],
+                                             layout.origin[1], layout.board_size[0], layout.board_size[1]))
+    count = 0
+    for scenario in scenarios:
+        if isinstance(scenario, RecordError):
+            raise ValueError("Record {} cannot be converted: {}".format(scenario.record_id, scenario.message))
+
+        if not isinstance(scenario.record_id, int):
+            raise ValueError("Record id {!r} is not an integer.".format(scenario.record_id))
+
+        if scenario.layout != layout:
+            raise ValueError("Record {} does not have the layout of the binary file.".format(scenario.record_id))
+
+        coordinates = array.array("q", [value for puck in scenario.pucks for value in puck])
+        if sys.byteorder != "little":
+            coordinates.byteswap()
+
+        stream.write(_RECORD.pack(scenario.record_id, len(scenario.pucks)))
+        stream.write(coordinates.tobytes())
+        count += 1
+
+    return count
+
+
+def process(scenarios, pool=None):
+    """
+    This function generates the result (a JSON-compatible dict) of every scenario, in order: its pucks are assigned
+    to their closest parking spots, gaps are filled and every puck is worked on once. One warm library per layout is
+    reused from the pool from record to record.
+    """
+    pool = LibraryPool(size=1) if pool is None else pool
+    for scenario in scenarios:
+        if isinstance(scenario, RecordError):
+            yield {"id": scenario.record_id, "error": scenario.message}
+            continue
+
+        puck_library = pool.acquire(scenario.layout)
+        try:
+            puck_library.load_pucks(scenario.pucks)
+            assigned = puck_library.assign_all()
+            gaps = puck_library.check_gaps()
+            puck_library.fill_gaps()
+            puck_library.move_and_perform_work()
+        except (TypeError, ValueError, OverflowError) as error:
+            yield {"id": scenario.record_id, "error": str(error)}
+        else:
+            yield {"id": scenario.record_id,
+                   "spots": [[ps.get_x_coordinate(), ps.get_y_coordinate()] for ps in assigned],
+                   "gaps": gaps,
+                   "pucks": [list(location) for location in puck_library.get_puck_locations()],
+                   "worked": sum(puck.get_work_complete_status() for puck in puck_library.pucks)}
+        finally:
+            pool.release(puck_library)
+
+
+def write_jsonl(results, stream):
+    """This function writes every result as a JSON line as soon as it is generated, and returns how many there
+    were."""
+    count = 0
+    for result in results:
+        stream.write(json.dumps(result))
+        stream.write("\n")
+        count += 1
+
+    return count
+
+
+def open_scenarios(path):
+    """Return the input stream of a scenario file and the reader for its format (detected from the binary header)."""
+    stream = open(path, "rb")
+    if stream.peek(len(BINARY_MAGIC))[:len(BINARY_MAGIC)] == BINARY_MAGIC:
+        return stream, read_binary
+
+    stream.close()
+    return open(path, "r", encoding="utf-8"), read_jsonl
+
+
+def run(input_path, output_path, progress=None, log=sys.stderr):
+    """
+    This function streams every scenario of an input file through the pipeline into a JSON Lines output file
+    ("-" for stdout) and returns the number of records, errors and the records-per-second rate as a dict. With
+    progress, the rate so far is logged every 'progress' records.
+    """
+    started = time.perf_counter()
+    counts = {"records": 0, "errors": 0}
+
+    def counted(results):
+        for result in results:
+            counts["records"] += 1
+            counts["errors"] += "error" in result
+            if progress and counts["records"] % progress == 0:
+                elapsed = time.perf_counter() - started
+                print("{} records, {:.0f} records/s".format(counts["records"], counts["records"] / elapsed), file=log)
+            yield result
+
+    source, reader = open_scenarios(input_path)
+    output = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+    try:
+        write_jsonl(counted(process(reader(source))), output)
+    finally:
+        source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    counts["seconds"] = elapsed
+    counts["records_per_second"] = counts["records"] / elapsed if elapsed else 0.0
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded puck boards from a JSONL or binary file.")
+    parser.add_argument("input", help="JSON Lines or binary scenario file")
+    parser.add_argument("output", help="JSON Lines result file ('-' for stdout), or binary file with --convert")
+    parser.add_argument("--progress", type=int, default=None, help="log the rate every N records")
+    parser.add_argument("--convert", action="store_true", help="convert a JSONL scenario file to the binary format")
+    parser.add_argument("--rows", type=int, default=DEFAULT_LAYOUT.rows, help="layout of the binary file")
+    parser.add_argument("--columns", type=int, default=DEFAULT_LAYOUT.columns)
+    parser.add_argument("--pitch", type=int, default=DEFAULT_LAYOUT.pitch)
+    args = parser.parse_args(argv)
+
+    if args.convert:
+        layout = grid_layout(args.rows, args.columns, args.pitch)
+        with open(args.input, "r", encoding="utf-8") as source, open(args.output, "wb") as output:
+            count = write_binary(read_jsonl(source), output, layout)
+        print(json.dumps({"records": count}), file=sys.stderr)
+        return
+
+    print(json.dumps(run(args.input, args.output, args.progress)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from ali_solution import PuckLibrary
+from board_layout import DEFAULT_LAYOUT, BoardLayout
+from streaming import *
+
+
+def scenario_lines(count, seed):
+    """Return count JSONL lines of random boards on the default layout."""
+    rng = random.Random(seed)
+    return [json.dumps({"id": idx, "pucks": [list(puck) for puck in DEFAULT_LAYOUT.generate_pucks(None, rng)]})
+            for idx in range(count)]
+
+
+class StreamingTestCase(unittest.TestCase):
+
+    def test_one(self):
+        """Test that every record gets the same result as running the program stages on a fresh library."""
+        lines = scenario_lines(30, 1)
+        results = list(process(read_jsonl(io.StringIO("\n".join(lines) + "\n"))))
+        self.assertEqual(30, len(results))
+
+        for line, result in zip(lines, results):
+            record = json.loads(line)
+            puck_library = PuckLibrary()
+            puck_library.populate_parking_spots()
+            puck_library.populate_pucks(len(record["pucks"]))
+            for puck, (x_coordinate, y_coordinate) in zip(puck_library.pucks, record["pucks"]):
+                puck.set_x_coordinate(x_coordinate)
+                puck.set_y_coordinate(y_coordinate)
+
+            spots = [[ps.get_x_coordinate(), ps.get_y_coordinate()] for ps in puck_library.assign_all()]
+            gaps = puck_library.check_gaps()
+            puck_library.fill_gaps()
+            puck_library.move_and_perform_work()
+            self.assertEqual({"id": record["id"], "spots": spots, "gaps": gaps,
+                              "pucks": [list(location) for location in puck_library.get_puck_locations()],
+                              "worked": len(record["pucks"])}, result)
+
+    def test_two(self):
+        """Test that a bad record is reported in the output without stopping the stream, and that records can use
+        their own layout."""
+        source = io.StringIO('{"id": "a", "pucks": [[0, 0]]}\nnot json\n\n{"pucks": [[0, 0]] * 10}\n'
+                             '{"pucks": [[0, 0], [1, 1], [2, 2]], "layout": {"rows": 1, "columns": 2}}\n'
+                             '{"pucks": [[5, 5]], "layout": {"rows": 1, "columns": 2, "origin": [0, 0]}}\n'
+                             '{"pucks": [[1e30, 0]]}\n{"pucks": [[0, -9223372036854775809]]}\n{"pucks": [[0, "0"]]}\n'
+                             '{"pucks": [[0, 0]], "layout": {"rows": 2, "columns": 2, "origin": [1]}}\n')
+        results = list(process(read_jsonl(source)))
+        self.assertEqual(["a", 2, 4, 5, 6, 7, 8, 9, 10], [result["id"] for result in results])
+        self.assertEqual([False, True, True, True, False, True, True, True, True],
+                         ["error" in result for result in results])
+        self.assertEqual([[120, 0]], results[4]["pucks"])
+
+    def test_three(self):
+        """Test that a JSONL file and its binary conversion stream to the same result file."""
+        lines = scenario_lines(200, 3)
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl_path, binary_path = os.path.join(directory, "boards.jsonl"), os.path.join(directory, "boards.bin")
+            with open(jsonl_path, "w") as stream:
+                stream.write("\n".join(lines) + "\n")
+            with open(jsonl_path) as source, open(binary_path, "wb") as output:
+                self.assertEqual(200, write_binary(read_jsonl(source), output))
+
+            outputs = []
+            for path in (jsonl_path, binary_path):
+                output_path = path + ".out"
+                log = io.StringIO()
+                stats = run(path, output_path, progress=100, log=log)
+                self.assertEqual((200, 0), (stats["records"], stats["errors"]))
+                self.assertTrue(stats["records_per_second"] > 0)
+                self.assertEqual(2, len(log.getvalue().splitlines()))
+                with open(output_path) as stream:
+                    outputs.append(stream.read())
+
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertEqual(200, len(outputs[0].splitlines()))
+
+            with open(binary_path, "rb") as stream:
+                data = stream.read()
+            self.assertRaises(ValueError, list, read_binary(io.BytesIO(data[:-4])))
+            self.assertRaises(ValueError, list, read_binary(io.BytesIO(b"nope")))
+            self.assertRaises(ValueError, write_binary, [Scenario(0, BoardLayout(2, 2), [])], io.BytesIO())
+
+
+if __name__ == '__main__':
+    unittest.main()